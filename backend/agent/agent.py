@@ -7,6 +7,7 @@ from utils.config_loader import (
   get_guided_input
 )
 from agent.source_review import run_review
+from ai.llm_cache import disable_cache
 
 load_dotenv()
 
@@ -24,12 +25,16 @@ def main():
   parser.add_argument("--source-file", default=get_default_source_path())
   parser.add_argument("--conf", action="store_true")
   parser.add_argument("--guided", action="store_true")
+  parser.add_argument("--no-cache", action="store_true")
 
   args = parser.parse_args()
 
   if args.conf and args.guided:
     parser.error("Cannot use both --conf and --guided")
 
+  if args.no_cache:
+    disable_cache()
+
   if any([
     args.target != parser.get_default("target"),
     args.ports != parser.get_default("ports"),
@@ -1,19 +1,85 @@
+import asyncio
+import configparser
+import hashlib
 import json
 from pathlib import Path
 import os
-import google.generativeai as genai
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from typing import Optional
-from ..ai.inference import prompt_ai
+from ..ai.inference import SUPPORTS_ASYNC, is_rate_limited, prompt_ai, prompt_ai_async, prompt_ai_sync
+from ..ai.llm_cache import CACHE_STATS
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY", ""))
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pathspec
+except ImportError:
+    pathspec = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+try:
+    import yaml
+    YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
 
 REPORT_PATH = Path("../reports/source_review_report.json")
+NDJSON_REPORT_PATH = REPORT_PATH.with_suffix(".ndjson")
 CONFIG_EXTENSIONS = {".json", ".yaml", ".yml", ".toml", ".ini", ".cfg"}
+SMALL_CONFIG_BYTES = 2048
+CONFIG_OK = "Config parses cleanly; no review requested."
+# Directory listings and small reads block in the kernel with the GIL
+# released, so threads overlap them well on slow or network filesystems.
+IO_WORKERS = 16
+MAX_CONCURRENT_REVIEWS = int(os.getenv("REVIEW_CONCURRENCY", "8"))
+MAX_CONCURRENT_REVIEWS_CAP = int(os.getenv("REVIEW_MAX_CONCURRENCY", "32"))
+RATE_LIMIT_BACKOFF = 5
+DEBUG = bool(os.getenv("NSCAN_DEBUG"))
+REPORT_STATS = {"reviews": 0, "chars": 0}
+SKIP_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".svg",
+    ".pdf", ".zip", ".gz", ".tar", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".jar", ".war",
+    ".so", ".o", ".a", ".dll", ".exe", ".bin", ".class", ".pyc", ".wasm",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".avi", ".mov", ".lock",
+}
+SKIP_SUFFIXES = (".min.js", ".min.css", ".map")
+MAX_FILE_BYTES = 256 * 1024
+BINARY_SNIFF_BYTES = 4096
+UNREADABLE_SKIP = "skipped: binary or oversized file"
+CHUNK_THRESHOLD = 16 * 1024
+CHUNK_OVERLAP = 1024
+SMALL_FILE_BYTES = 1024
+BATCH_MAX_BYTES = 32 * 1024
+BATCH_MAX_FILES = 16
+BATCH_HEADER = (
+    "Review each of the following files separately for bugs, improvements, and readability issues. "
+    "Start the review of each file with a line of the form '=== REVIEW: <path> ===' using the exact path given.\n\n"
+)
+SKIP_DIRS = {
+    "node_modules", ".git", ".hg", ".svn", "__pycache__", "venv", ".venv",
+    "dist", "build", "target", ".mypy_cache", ".pytest_cache", ".tox", ".idea",
+}
+
+def is_binary(buf: bytes) -> bool:
+    return b"\x00" in buf[:BINARY_SNIFF_BYTES]
 
-def read_source_code(path: Path) -> str:
-    if not path.is_file():
-        raise FileNotFoundError(f"File not found: {path}")
-    return path.read_text(errors="ignore")
+def read_for_review(path: str) -> Optional[bytes]:
+    with open(path, "rb") as f:
+        buf = f.read(MAX_FILE_BYTES + 1)
+    if len(buf) > MAX_FILE_BYTES or is_binary(buf):
+        return None
+    return buf
+
+def read_source_code(path: str) -> Optional[str]:
+    buf = read_for_review(path)
+    return buf.decode("utf-8", "replace") if buf is not None else None
 
 def review_source_code(source_code: Optional[str]=None, filename: str= "", prompt: str="") -> str:
     return prompt_ai(
@@ -23,37 +89,408 @@ def review_source_code(source_code: Optional[str]=None, filename: str= "", promp
         model_name="gemini-2.0-flash"
     )
 
-def gather_all_files(directory: Path):
-    return [f for f in directory.rglob("*") if f.is_file()]
+def split_into_chunks(source_code: str, size: int = CHUNK_THRESHOLD, overlap: int = CHUNK_OVERLAP) -> list:
+    lines = source_code.splitlines(keepends=True)
+    chunks = []
+    start = 0
+    while start < len(lines):
+        end = start
+        length = 0
+        while end < len(lines) and (length == 0 or length + len(lines[end]) <= size):
+            length += len(lines[end])
+            end += 1
+        chunks.append((start + 1, end, "".join(lines[start:end])))
+        if end >= len(lines):
+            break
+        # Step back far enough to repeat roughly `overlap` characters in the next chunk
+        next_start = end
+        carried = 0
+        while next_start > start + 1 and carried + len(lines[next_start - 1]) <= overlap:
+            next_start -= 1
+            carried += len(lines[next_start])
+        start = next_start
+    return chunks
+
+async def _limited(limiter, **kwargs) -> str:
+    if limiter is None:
+        return await prompt_ai_async(**kwargs)
+    async with limiter:
+        response = await prompt_ai_async(**kwargs)
+    await limiter.record(response)
+    return response
+
+async def review_source_code_async(source_code: Optional[str]=None, filename: str= "", prompt: str="", limiter=None) -> str:
+    # Each model request, including every chunk of a large file, takes its own limiter slot
+    if prompt or not source_code or len(source_code) <= CHUNK_THRESHOLD:
+        return await _limited(
+            limiter,
+            source_code=source_code,
+            filename=filename,
+            prompt=prompt,
+            model_name="gemini-2.0-flash"
+        )
+
+    chunks = split_into_chunks(source_code)
+    reviews = await asyncio.gather(*(
+        _limited(
+            limiter,
+            source_code=chunk,
+            filename=f"{filename} (lines {first}-{last})",
+            model_name="gemini-2.0-flash"
+        )
+        for first, last, chunk in chunks
+    ))
+    return "\n\n".join(
+        f"## Chunk {i}/{len(chunks)} (lines {first}-{last})\n\n{review}"
+        for i, ((first, last, _), review) in enumerate(zip(chunks, reviews), 1)
+    )
+
+def build_batch_prompt(files: list) -> str:
+    parts = [BATCH_HEADER]
+    for path, code in files:
+        parts.append(f"=== FILE: {path} ===\n{code}\n")
+    return "".join(parts)
+
+def parse_batch_review(response: str, paths: list) -> Optional[dict]:
+    reviews = {}
+    for block in response.split("=== REVIEW: ")[1:]:
+        header, _, body = block.partition("\n")
+        path = header.strip().removesuffix("===").strip()
+        reviews[path] = body.strip()
+    if not all(path in reviews for path in paths):
+        return None
+    return reviews
+
+def plan_batches(groups) -> tuple:
+    singles = []
+    batches = []
+    current = []
+    current_bytes = 0
+    for group in groups:
+        try:
+            size = group[0].stat(follow_symlinks=False).st_size
+        except OSError:
+            size = SMALL_FILE_BYTES
+        if size >= SMALL_FILE_BYTES:
+            singles.append(group)
+            continue
+        if current and (current_bytes + size > BATCH_MAX_BYTES or len(current) >= BATCH_MAX_FILES):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(group)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    # A batch of one gains nothing over the single-file path
+    singles.extend(batch[0] for batch in batches if len(batch) == 1)
+    return singles, [batch for batch in batches if len(batch) > 1]
+
+def _dumps(obj, indent: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+def write_report_line(sink, path: str, review: str):
+    sink.write(_dumps({"path": path, "review": review}) + b"\n")
+    sink.flush()
+    REPORT_STATS["reviews"] += 1
+    REPORT_STATS["chars"] += len(review)
+    if DEBUG:
+        print(f"{path}: {review}")
+
+class AdaptiveLimiter:
+    """Concurrency limit that grows after a run of successes and halves on rate limiting."""
+
+    def __init__(self, initial: int, maximum: int, grow_after: int = 100):
+        self.limit = max(1, initial)
+        self.maximum = max(self.limit, maximum)
+        self.grow_after = grow_after
+        self.in_flight = 0
+        self.successes = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def record(self, response: str):
+        if is_rate_limited(response):
+            async with self._cond:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+            print(f"⚠️  Rate limited, concurrency lowered to {self.limit}")
+            await asyncio.sleep(RATE_LIMIT_BACKOFF)
+            return
+        async with self._cond:
+            self.successes += 1
+            if self.successes >= self.grow_after and self.limit < self.maximum:
+                self.limit += 1
+                self.successes = 0
+                self._cond.notify_all()
+
+async def review_files(groups, sink, bodies=None):
+    # Small group representatives arrive already read by the digest pass
+    bodies = bodies or {}
+
+    def body_of(path: str) -> Optional[str]:
+        body = bodies.pop(path, None)
+        return body if body is not None else read_source_code(path)
+
+    limiter = AdaptiveLimiter(MAX_CONCURRENT_REVIEWS, MAX_CONCURRENT_REVIEWS_CAP)
+    # Files may be read ahead of a free LLM slot so disk I/O overlaps with
+    # in-flight requests; this bounds how many bodies are held in memory.
+    prefetch = asyncio.Semaphore(2 * MAX_CONCURRENT_REVIEWS_CAP)
+
+    async def bounded(group: list):
+        entry = group[0]
+        async with prefetch:
+            try:
+                code = await asyncio.to_thread(body_of, entry.path)
+                if code is None:
+                    review = UNREADABLE_SKIP
+                else:
+                    print(f"🔍 Reviewing: {entry.path}")
+                    review = await review_source_code_async(code, entry.path, limiter=limiter)
+            except Exception as e:
+                print(f"❌ Error reviewing {entry.path}: {e}")
+                review = f"Error: {e}"
+        for duplicate in group:
+            write_report_line(sink, duplicate.path, review)
+
+    async def bounded_batch(batch: list):
+        # Groups that still need a report line; unreadable ones are written as soon as they are known
+        pending = list(batch)
+        async with prefetch:
+            try:
+                codes = await asyncio.to_thread(lambda: [body_of(g[0].path) for g in batch])
+                readable = []
+                for group, code in zip(batch, codes):
+                    if code is None:
+                        for duplicate in group:
+                            write_report_line(sink, duplicate.path, UNREADABLE_SKIP)
+                    else:
+                        readable.append((group, code))
+                pending = [group for group, _ in readable]
+                if not readable:
+                    return
+                paths = [group[0].path for group, _ in readable]
+
+                async with limiter:
+                    print(f"🔍 Reviewing batch of {len(readable)} small files")
+                    response = await prompt_ai_async(
+                        prompt=build_batch_prompt([(g[0].path, code) for g, code in readable]),
+                        model_name="gemini-2.0-flash",
+                        output_scale=len(readable)
+                    )
+                await limiter.record(response)
+                reviews = parse_batch_review(response, paths)
+
+                if reviews is None:
+                    print("⚠️  Batch response could not be split per file, reviewing individually")
+                    reviews = {}
+                    for group, code in readable:
+                        reviews[group[0].path] = await review_source_code_async(code, group[0].path, limiter=limiter)
+            except Exception as e:
+                print(f"❌ Error reviewing batch: {e}")
+                reviews = {group[0].path: f"Error: {e}" for group in pending}
+
+        for group in pending:
+            for duplicate in group:
+                write_report_line(sink, duplicate.path, reviews[group[0].path])
+
+    singles, batches = plan_batches(groups)
+    await asyncio.gather(
+        *(bounded(g) for g in singles),
+        *(bounded_batch(b) for b in batches)
+    )
+
+def _review_in_process(path: str) -> tuple:
+    """Read and review one file inside a pool worker; returns the review and this call's cache hits/misses."""
+    hits, misses = CACHE_STATS["hits"], CACHE_STATS["misses"]
+    try:
+        code = read_source_code(path)
+    except Exception as e:
+        print(f"❌ Error reviewing {path}: {e}")
+        return f"Error: {e}", 0, 0
+    if code is None:
+        return UNREADABLE_SKIP, 0, 0
+    print(f"🔍 Reviewing: {path}")
+    review = prompt_ai_sync({"source_code": code, "filename": path, "model_name": "gemini-2.0-flash"})
+    return review, CACHE_STATS["hits"] - hits, CACHE_STATS["misses"] - misses
+
+def review_files_in_processes(groups, sink):
+    # Only paths cross to the workers; each file body is read by the process that reviews it
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(_review_in_process, [group[0].path for group in groups])
+        for group, (review, hits, misses) in zip(groups, results):
+            # Cache counters live in the children; fold them into this process's totals
+            CACHE_STATS["hits"] += hits
+            CACHE_STATS["misses"] += misses
+            for duplicate in group:
+                write_report_line(sink, duplicate.path, review)
+
+def ndjson_to_json(ndjson_path: Path = NDJSON_REPORT_PATH, json_path: Path = REPORT_PATH) -> dict:
+    loads = orjson.loads if orjson is not None else json.loads
+    reports = {}
+    with open(ndjson_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                record = loads(line)
+                reports[record["path"]] = record["review"]
+    Path(json_path).write_bytes(_dumps(reports, indent=True))
+    return reports
+
+def load_gitignore(directory: str):
+    gitignore = os.path.join(directory, ".gitignore")
+    if pathspec is None or not os.path.isfile(gitignore):
+        return None
+    with open(gitignore, "r", errors="ignore") as f:
+        return pathspec.PathSpec.from_lines("gitwildmatch", f)
+
+def _scan_dir(current: str, root: str, ignore, skip_dirs) -> tuple:
+    dirs = []
+    files = []
+    try:
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_dir and entry.name in skip_dirs:
+                    continue
+                if ignore is not None:
+                    rel = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    if ignore.match_file(rel + "/" if is_dir else rel):
+                        continue
+                if is_dir:
+                    dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry)
+    except OSError:
+        pass
+    return dirs, files
+
+def gather_all_files(directory, skip_dirs=SKIP_DIRS):
+    root = str(directory)
+    ignore = load_gitignore(root)
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        pending = {executor.submit(_scan_dir, root, root, ignore, skip_dirs)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dirs, files = future.result()
+                for path in dirs:
+                    pending.add(executor.submit(_scan_dir, path, root, ignore, skip_dirs))
+                yield from files
+
+def file_suffix(entry: os.DirEntry) -> str:
+    return os.path.splitext(entry.name)[1].lower()
+
+def skip_reason(entry: os.DirEntry) -> Optional[str]:
+    name = entry.name.lower()
+    if file_suffix(entry) in SKIP_EXTENSIONS or name.endswith(SKIP_SUFFIXES):
+        return "skipped: unsupported file type"
+    if entry.stat(follow_symlinks=False).st_size > MAX_FILE_BYTES:
+        return f"skipped: larger than {MAX_FILE_BYTES} bytes"
+    return None
+
+def config_parses_cleanly(suffix: str, buf: bytes) -> bool:
+    if len(buf) >= SMALL_CONFIG_BYTES:
+        return False
+    text = buf.decode("utf-8", "replace")
+    try:
+        if suffix == ".json":
+            json.loads(text)
+        elif suffix == ".toml" and tomllib is not None:
+            tomllib.loads(text)
+        elif suffix in (".yaml", ".yml") and yaml is not None:
+            yaml.load(text, Loader=YamlLoader)
+        elif suffix in (".ini", ".cfg"):
+            configparser.ConfigParser().read_string(text)
+        else:
+            return False
+    except Exception:
+        # A parse error is exactly what the reviewer should look at
+        return False
+    return True
+
+def _inspect(entry: os.DirEntry) -> tuple:
+    """(content digest, config parses cleanly, small body) from a single read; the path stands in as key if unreadable."""
+    try:
+        buf = read_for_review(entry.path)
+    except OSError:
+        return entry.path, False, None
+    if buf is None:
+        return None, False, None
+    suffix = file_suffix(entry)
+    clean = suffix in CONFIG_EXTENSIONS and config_parses_cleanly(suffix, buf)
+    # Only small files keep their bytes, so memory stays bounded on large trees
+    body = buf.decode("utf-8", "replace") if len(buf) < SMALL_FILE_BYTES else None
+    return hashlib.blake2b(buf, digest_size=16).digest(), clean, body
+
+def group_by_content(entries) -> tuple:
+    groups = {}
+    unreadable = []
+    clean_configs = []
+    bodies = {}
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        inspected = list(executor.map(_inspect, entries))
+    for entry, (key, clean, body) in zip(entries, inspected):
+        if key is None:
+            unreadable.append(entry)
+        elif clean:
+            clean_configs.append(entry)
+        elif key in groups:
+            groups[key].append(entry)
+        else:
+            groups[key] = [entry]
+            if body is not None:
+                bodies[entry.path] = body
+    return list(groups.values()), unreadable, clean_configs, bodies
 
 def run_review(dir_path: str):
     base_path = Path(dir_path)
     if not base_path.is_dir():
         raise NotADirectoryError(f"Provided path is not a directory: {dir_path}")
 
-    all_files = gather_all_files(base_path)
+    REPORT_STATS.update(reviews=0, chars=0)
+    NDJSON_REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(NDJSON_REPORT_PATH, "ab") as sink:
+        config_files = []
+        other_files = []
+        for entry in gather_all_files(base_path):
+            try:
+                reason = skip_reason(entry)
+            except OSError as e:
+                reason = f"Error: {e}"
+            if reason:
+                write_report_line(sink, entry.path, reason)
+                continue
+            if file_suffix(entry) in CONFIG_EXTENSIONS:
+                config_files.append(entry)
+            else:
+                other_files.append(entry)
 
-    config_files = [f for f in all_files if f.suffix.lower() in CONFIG_EXTENSIONS]
-    other_files = [f for f in all_files if f.suffix.lower() not in CONFIG_EXTENSIONS]
+        # Each file is read once, in the pool, for both its digest and the config check
+        groups, unreadable, clean_configs, bodies = group_by_content(config_files + other_files)
+        for entry in clean_configs:
+            write_report_line(sink, entry.path, CONFIG_OK)
+        for entry in unreadable:
+            write_report_line(sink, entry.path, UNREADABLE_SKIP)
 
-    reports = {}
+        if SUPPORTS_ASYNC:
+            asyncio.run(review_files(groups, sink, bodies))
+        else:
+            review_files_in_processes(groups, sink)
 
-    for file_path in config_files + other_files:
-        try:
-            code = read_source_code(file_path)
-            print(f"🔍 Reviewing: {file_path}")
-            review = review_source_code(code, str(file_path))
-            reports[str(file_path)] = review
-        except Exception as e:
-            print(f"❌ Error reviewing {file_path}: {e}")
-            reports[str(file_path)] = f"Error: {e}"
-
-    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    print(reports)
-    with open(REPORT_PATH, "w") as f:
-        json.dump(reports, f, indent=2)
-
-    print(f"\n✅ Review report saved to: {REPORT_PATH}")
+    print(f"\n✅ Wrote {REPORT_STATS['reviews']} reviews ({REPORT_STATS['chars']} chars) to: {NDJSON_REPORT_PATH}")
+    print(f"📦 LLM cache: {CACHE_STATS['hits']} hits, {CACHE_STATS['misses']} misses")
 
 if __name__ == "__main__":
     import sys
@@ -1,6 +1,67 @@
+import asyncio
+import os
+import random
+import time
+from functools import lru_cache
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from .llm_cache import cache_key, cache_get, cache_set
+from .ratelimit import TokenBucket, estimate_tokens
 
-def prompt_ai(**kwargs) -> str:
+# Whether the active backend exposes a native async API; callers fall back
+# to a process pool when it does not.
+SUPPORTS_ASYNC = True
+
+MAX_OUTPUT_TOKENS = 1024
+MAX_ATTEMPTS = 6
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+)
+RESPONSE_CHAR_CAP = 8 * 1024
+# Spaces requests out under the provider quota instead of discovering it through 429s
+_bucket = TokenBucket.from_env("GEMINI", rpm=60, tpm=1_000_000)
+
+_DEFAULT_PROMPT = ("Please review this file '", "' for bugs, improvements, and readability issues:\n\n")
+
+_configured = False
+
+def _configure():
+    global _configured
+    if not _configured:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY", ""))
+        _configured = True
+
+@lru_cache(maxsize=8)
+def _model(name: str) -> genai.GenerativeModel:
+    _configure()
+    return genai.GenerativeModel(name)
+
+def _backoff(attempt: int) -> float:
+    # Truncated exponential backoff with full jitter
+    return random.uniform(0, min(30, 0.5 * 2 ** attempt))
+
+def _error(e: Exception) -> str:
+    print("Error:", e)
+    return f"Error calling Gemini API: {type(e).__name__}: {e}"
+
+def is_error(response: str) -> bool:
+    return response.startswith("Error calling Gemini API")
+
+def is_rate_limited(response: str) -> bool:
+    return is_error(response) and (
+        "429" in response or "ResourceExhausted" in response or "quota" in response.lower()
+    )
+
+def _hit_token_limit(response) -> bool:
+    try:
+        return response.candidates[0].finish_reason.name == "MAX_TOKENS"
+    except (AttributeError, IndexError, TypeError):
+        return False
+
+def _prepare(kwargs) -> tuple:
     source_code = kwargs.get("source_code", "")
     filename = kwargs.get("filename", "")
     prompt = kwargs.get("prompt", "")
@@ -8,15 +69,104 @@ def prompt_ai(**kwargs) -> str:
     temperature = kwargs.get("temperature", 0.7)
 
     if not prompt:
-        prompt = (
-            f"Please review this file '{filename}' for bugs, improvements, and readability issues:\n\n"
-            f"{source_code}"
-        )
+        prompt = "".join((_DEFAULT_PROMPT[0], filename, _DEFAULT_PROMPT[1], source_code or ""))
+
+    return prompt, model_name, temperature
+
+def prompt_ai(**kwargs) -> str:
+    prompt, model_name, temperature = _prepare(kwargs)
+    # Callers that manage their own caching pass cache=False
+    use_cache = kwargs.get("cache", True)
+
+    key = cache_key(model_name, temperature, prompt)
+    cached = cache_get(key) if use_cache else None
+    if cached is not None:
+        return cached
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            _bucket.acquire(estimate_tokens(prompt))
+            model = _model(model_name)
+            response = model.generate_content(prompt, generation_config={"temperature": temperature})
+            text = response.text.strip()
+            if use_cache:
+                cache_set(key, text)
+            return text
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                return _error(e)
+            time.sleep(_backoff(attempt))
+        except Exception as e:
+            return _error(e)
 
+def stream_ai(**kwargs):
+    """Like prompt_ai, but yields the response text in chunks as the model produces them."""
+    prompt, model_name, temperature = _prepare(kwargs)
+    use_cache = kwargs.get("cache", True)
+
+    key = cache_key(model_name, temperature, prompt)
+    cached = cache_get(key) if use_cache else None
+    if cached is not None:
+        yield cached
+        return
+
+    # No retries once output has started flowing; a failure is yielded as the error string
+    _bucket.acquire(estimate_tokens(prompt))
+    parts = []
     try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt, generation_config={"temperature": temperature})
-        return response.text.strip()
+        model = _model(model_name)
+        response = model.generate_content(prompt, generation_config={"temperature": temperature}, stream=True)
+        for chunk in response:
+            parts.append(chunk.text)
+            yield chunk.text
     except Exception as e:
-        print("Error:", e)
-        return f"Error calling Gemini API: {e}"
\ No newline at end of file
+        yield _error(e)
+        return
+    if use_cache:
+        cache_set(key, "".join(parts).strip())
+
+def prompt_ai_sync(prompt_kwargs: dict) -> str:
+    return prompt_ai(**prompt_kwargs)
+
+async def prompt_ai_async(**kwargs) -> str:
+    prompt, model_name, temperature = _prepare(kwargs)
+    use_cache = kwargs.get("cache", True)
+    # Prompts covering several files (batch reviews) scale the output budget with them
+    output_scale = max(1, kwargs.get("output_scale", 1))
+    max_output_tokens = MAX_OUTPUT_TOKENS * output_scale
+    char_cap = RESPONSE_CHAR_CAP * output_scale
+
+    key = cache_key(model_name, temperature, prompt)
+    cached = cache_get(key) if use_cache else None
+    if cached is not None:
+        return cached
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            await _bucket.acquire_async(estimate_tokens(prompt))
+            model = _model(model_name)
+            response = await model.generate_content_async(
+                prompt,
+                generation_config={"temperature": temperature, "max_output_tokens": max_output_tokens},
+                stream=True
+            )
+            parts = []
+            received = 0
+            truncated = False
+            async for chunk in response:
+                parts.append(chunk.text)
+                received += len(chunk.text)
+                if received > char_cap:
+                    truncated = True
+                    break
+            text = "".join(parts).strip()
+            # A cut-off answer is returned but never cached, so the next run asks again
+            if use_cache and not truncated and not _hit_token_limit(response):
+                cache_set(key, text)
+            return text
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                return _error(e)
+            await asyncio.sleep(_backoff(attempt))
+        except Exception as e:
+            return _error(e)
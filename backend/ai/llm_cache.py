@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+CACHE_PATH = Path("../reports/.llm_cache/cache.db")
+CACHE_TTL = 7 * 86400
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+_enabled = os.getenv("LLM_CACHE", "1") != "0"
+_conn = None
+_lock = threading.Lock()
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(CACHE_PATH), check_same_thread=False)
+        _conn.execute("CREATE TABLE IF NOT EXISTS c (k TEXT PRIMARY KEY, v TEXT, ts REAL)")
+    return _conn
+
+def disable_cache():
+    global _enabled
+    _enabled = False
+
+def cache_key(model_name: str, temperature: float, prompt: str) -> str:
+    payload = json.dumps({"m": model_name, "t": temperature, "p": prompt}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cache_get(key: str) -> Optional[str]:
+    if not _enabled:
+        return None
+    with _lock:
+        row = _connection().execute("SELECT v, ts FROM c WHERE k=?", (key,)).fetchone()
+        if row and time.time() - row[1] < CACHE_TTL:
+            CACHE_STATS["hits"] += 1
+            return row[0]
+        CACHE_STATS["misses"] += 1
+    return None
+
+def cache_set(key: str, value: str):
+    if not _enabled:
+        return
+    with _lock:
+        conn = _connection()
+        conn.execute("INSERT OR REPLACE INTO c (k, v, ts) VALUES (?, ?, ?)", (key, value, time.time()))
+        conn.commit()
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import threading
+import time
+
+def _per_worker(name: str, default: int) -> float:
+    # Provider limits are per account, so each worker process gets an equal share
+    workers = max(1, int(os.getenv("WORKERS", "1")))
+    return int(os.getenv(name, str(default))) / workers
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // 4 + 1
+
+class TokenBucket:
+    """Requests-per-minute and tokens-per-minute buckets refilled continuously; a limit <= 0 disables it."""
+
+    def __init__(self, rpm: float, tpm: float, burst: float = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        # Requests allowed back to back; defaults to a full minute's worth
+        self.burst = rpm if burst is None else burst
+        self._requests = self.burst
+        self._tokens = tpm
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str, rpm: int, tpm: int) -> "TokenBucket":
+        return cls(_per_worker(f"{prefix}_RPM", rpm), _per_worker(f"{prefix}_TPM", tpm))
+
+    def _reserve(self, tokens: int) -> float:
+        """Take capacity and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last
+            self._last = now
+            if self.rpm > 0:
+                self._requests = min(self.burst, self._requests + elapsed * self.rpm / 60)
+            if self.tpm > 0:
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                # A single prompt larger than the whole bucket would otherwise wait forever
+                tokens = min(tokens, self.tpm)
+
+            wait = 0.0
+            if self.rpm > 0 and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+            if self.tpm > 0 and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            if wait:
+                return wait
+
+            if self.rpm > 0:
+                self._requests -= 1
+            if self.tpm > 0:
+                self._tokens -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
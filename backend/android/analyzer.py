@@ -9,15 +9,148 @@ import os
 import sys
 import json
 import re
+import fnmatch
+import xml.parsers.expat
 import httpx
 import asyncio
 import time
-import subprocess
 import shutil
-import xml.etree.ElementTree as ET
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Iterator
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# expat reports namespaced attributes as "<uri> <localname>" with this separator
+ANDROID_NAME = 'http://schemas.android.com/apk/res/android name'
+COMPONENT_TAGS = frozenset(('activity', 'service', 'receiver', 'provider'))
+
+COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+GROQ_BASE_URL = 'https://api.groq.com'
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+JAVA_FILE_CHARS = 4000
+JAVA_BATCH_TOKENS = 6000
+# Concurrent Groq requests; bursts past the RPM are absorbed by the 429 backoff
+GROQ_CONCURRENCY = int(os.environ.get('GROQ_CONCURRENCY', '8'))
+
+_JADX_ERR_RE = re.compile(r'finished with errors, count: (\d+)')
+# Matches once per line that mentions "error" in any case
+_ERROR_LINE_RE = re.compile(r'^[^\n]*?error', re.IGNORECASE | re.MULTILINE)
+
+TEXT_ATTRS = [
+    "text", "hint", "contentDescription", "title", "summary",
+    "label", "subtitle", "message", "dialogTitle"
+]
+_HARDCODED_ATTR_RE = re.compile(r'(android:(' + '|'.join(TEXT_ATTRS) + r'))="((?!@string/)[^"\n]+)"')
+
+# Config files are matched by name suffix, so prefixed variants are still picked up
+XML_CONFIG_FILES = ('backup_rules.xml', 'data_extraction_rules.xml')
+
+def _walk_once(root) -> Iterator[Tuple[str, str, bool]]:
+    """Yield (name, path, is_file) for every entry under root in a single scandir pass"""
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                is_file = entry.is_file(follow_symlinks=False)
+                if not is_file and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                yield entry.name, entry.path, is_file
+
+def _find_json_span(s: str, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """Return the first balanced JSON array/object span in s[start:end] using one linear scan"""
+    if end is None:
+        end = len(s)
+    closers = {'[': ']', '{': '}'}
+    stack = []
+    begin = -1
+    in_string = False
+    escaped = False
+    for i in range(start, end):
+        ch = s[i]
+        if not stack:
+            if ch in closers:
+                begin = i
+                stack.append(closers[ch])
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in closers:
+            stack.append(closers[ch])
+        elif ch == ']' or ch == '}':
+            if ch != stack.pop():
+                return None
+            if not stack:
+                return begin, i + 1
+    return None
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    # sendfile writes at the destination's current position
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+# In-kernel copy primitives, fastest first; missing ones are skipped
+KERNEL_COPIES = tuple(
+    func for func, name in ((_copy_file_range, 'copy_file_range'), (_sendfile, 'sendfile'))
+    if hasattr(os, name)
+)
+
+def _fast_copy(src, dst):
+    """Hardlink src to dst, falling back to in-kernel copy_file_range/sendfile, then a plain copy"""
+    # The analysis tree is temporary, so metadata preservation is not needed
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        size = os.fstat(s.fileno()).st_size
+        offset = 0
+        for kernel_copy in KERNEL_COPIES:
+            d.seek(offset)
+            try:
+                while offset < size:
+                    copied = kernel_copy(s.fileno(), d.fileno(), offset, size - offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+                return
+            except OSError:
+                # e.g. EXDEV/ENOSYS on older kernels, or sendfile to a regular file on macOS
+                continue
+        s.seek(offset)
+        d.seek(offset)
+        shutil.copyfileobj(s, d)
+
+def _run_copy_jobs(copy_jobs: Dict[Path, str]):
+    """Copy files concurrently; copy_jobs maps destination to source"""
+    if not copy_jobs:
+        return
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        # list() so any copy error propagates like the serial copies did
+        list(executor.map(lambda job: _fast_copy(job[1], job[0]), copy_jobs.items()))
 
 class AndroidSecurityAnalyzer:
     def __init__(self, input_path: str, is_apk: bool = False):
@@ -35,6 +168,14 @@ class AndroidSecurityAnalyzer:
             # Project directory analysis setup
             self.base_directory = self.input_path
         
+        # File listing of base_directory, built on first pattern lookup
+        self._base_files: Optional[List[Tuple[str, str]]] = None
+        # Created lazily so they bind to the running event loop
+        self._groq_semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        # XML bodies are read by several analyses; keep each decoded once
+        self._xml_content_cache: Dict[str, str] = {}
+        
         self.groq_api_key = os.environ.get('GROQ_API_KEY')
         if not self.groq_api_key:
             print("Warning: GROQ_API_KEY environment variable not set. AI analysis will be skipped.")
@@ -47,18 +188,17 @@ class AndroidSecurityAnalyzer:
         
         # Look for error count in stdout (format: "finished with errors, count: X")
         if stdout:
-            error_match = re.search(r'finished with errors, count: (\d+)', stdout)
+            error_match = _JADX_ERR_RE.search(stdout)
             if error_match:
                 error_count = int(error_match.group(1))
         
         # If no error count found in stdout, count ERROR lines in stderr
         if error_count == 0 and stderr:
-            error_lines = [line for line in stderr.split('\n') if 'ERROR' in line.upper()]
-            error_count = len(error_lines)
+            error_count = sum(1 for _ in _ERROR_LINE_RE.finditer(stderr))
         
         return error_count
 
-    def step1_jadx_decompile(self) -> bool:
+    async def step1_jadx_decompile(self) -> bool:
         """Step 1: Decompile APK using JADX"""
         print("\n🔧 Step 1: Decompiling APK with JADX...")
         
@@ -67,22 +207,26 @@ class AndroidSecurityAnalyzer:
             return False
 
         try:
-            result = subprocess.run(
-                ["jadx", "-d", str(self.jadx_output_dir), str(self.apk_path)],
-                capture_output=True,
-                text=True
+            # Run JADX without blocking the event loop
+            proc = await asyncio.create_subprocess_exec(
+                "jadx", "-d", str(self.jadx_output_dir), str(self.apk_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
+            stdout_bytes, stderr_bytes = await proc.communicate()
+            stdout = stdout_bytes.decode("utf-8", "replace")
+            stderr = stderr_bytes.decode("utf-8", "replace")
             
             # Parse JADX output to check error count
-            error_count = self._parse_jadx_errors(result.stdout, result.stderr)
+            error_count = self._parse_jadx_errors(stdout, stderr)
             
             if error_count > 30:
                 print(f"❌ JADX failed with {error_count} errors (threshold: 30)")
                 print("This indicates significant issues with the APK structure.")
-                if result.stdout:
-                    print("JADX stdout:", result.stdout)
-                if result.stderr:
-                    print("JADX stderr:", result.stderr)
+                if stdout:
+                    print("JADX stdout:", stdout)
+                if stderr:
+                    print("JADX stderr:", stderr)
                 return False
             elif error_count > 0:
                 print(f"⚠️  JADX completed with {error_count} errors (acceptable, threshold: 30)")
@@ -121,7 +265,7 @@ class AndroidSecurityAnalyzer:
         if manifest_path.exists():
             manifest_dest = self.base_directory / "Manifest"
             manifest_dest.mkdir(exist_ok=True)
-            shutil.copy2(manifest_path, manifest_dest / "AndroidManifest.xml")
+            _fast_copy(manifest_path, manifest_dest / "AndroidManifest.xml")
             print(f"✅ Manifest copied to {manifest_dest}")
         
         # Copy activity layout XML files
@@ -129,29 +273,63 @@ class AndroidSecurityAnalyzer:
         layout_dir = self.base_directory / output_subdir_name
         layout_dir.mkdir(exist_ok=True)
         
-        pattern = re.compile(r'^activity_.*\.xml$')
+        collected = self._collect_jadx_files()
+        # Destination -> source; later entries win on name clashes, as with serial copies
+        copy_jobs: Dict[Path, str] = {}
         copied_count = 0
         
-        for root, _, files in os.walk(self.jadx_output_dir):
-            for file in files:
-                if pattern.match(file):
-                    source_file = Path(root) / file
-                    destination = layout_dir / file
-                    shutil.copy2(source_file, destination)
-                    copied_count += 1
+        for source_file in collected['activity']:
+            copy_jobs[layout_dir / os.path.basename(source_file)] = source_file
+            copied_count += 1
         
-        print(f"✅ Copied {copied_count} activity XML files")
+        # Queue Java source files
+        java_count = self._copy_java_files(collected['java'], copy_jobs)
         
-        # Copy Java source files
-        self._copy_java_files()
+        # Queue XML configuration files
+        xml_counts = self._copy_xml_config_files(collected, copy_jobs)
         
-        # Copy XML configuration files
-        self._copy_xml_config_files()
+        _run_copy_jobs(copy_jobs)
+        
+        print(f"✅ Copied {copied_count} activity XML files")
+        print(f"✅ Copied {java_count} Java files referenced in AndroidManifest.xml")
+        total_copied = 0
+        for xml_type, count in xml_counts.items():
+            total_copied += count
+            if count > 0:
+                print(f"✅ Copied {count} {xml_type} files")
+        print(f"✅ Total XML configuration files copied: {total_copied}")
         
         return True
 
-    def _copy_java_files(self):
-        """Copy only Java source files referenced in the AndroidManifest.xml"""
+    def _collect_jadx_files(self) -> Dict[str, list]:
+        """Classify the files needed from the JADX output in one directory pass"""
+        collected = {'activity': [], 'java': []}
+        for xml_type in XML_CONFIG_FILES:
+            collected[xml_type] = []
+        
+        root = os.fspath(self.jadx_output_dir)
+        sources_marker = os.sep + 'sources' + os.sep
+        
+        for name, path, is_file in _walk_once(root):
+            if not is_file:
+                continue
+            if name.endswith('.xml'):
+                if name.startswith('activity_'):
+                    collected['activity'].append(path)
+                for xml_type in XML_CONFIG_FILES:
+                    if name.endswith(xml_type):
+                        collected[xml_type].append(path)
+            elif name.endswith('.java'):
+                rel = path[len(root):]
+                idx = rel.find(sources_marker)
+                if idx != -1:
+                    # Keep the path relative to the sources directory for manifest matching
+                    collected['java'].append((path, rel[idx + len(sources_marker):]))
+        
+        return collected
+
+    def _copy_java_files(self, java_files: List[Tuple[str, str]], copy_jobs: Dict[Path, str]) -> int:
+        """Queue copies of only the Java source files referenced in the AndroidManifest.xml"""
         java_dest_dir = self.base_directory / "Java_Files"
         java_dest_dir.mkdir(exist_ok=True)
 
@@ -160,83 +338,90 @@ class AndroidSecurityAnalyzer:
         referenced_classes = set()
         if manifest_path.exists():
             try:
-                tree = ET.parse(manifest_path)
-                root = tree.getroot()
-                package = root.attrib.get('package', '')
-                # Android XML namespace
-                ns = {'android': 'http://schemas.android.com/apk/res/android'}
-                for tag in ['activity', 'service', 'receiver', 'provider']:
-                    for elem in root.iter(tag):
-                        name = elem.attrib.get('{http://schemas.android.com/apk/res/android}name')
-                        if name:
-                            # Handle fully qualified and relative class names
-                            if name.startswith('.'):
-                                fqcn = package + name
-                            elif '.' in name:
-                                fqcn = name
-                            else:
-                                fqcn = package + '.' + name
-                            referenced_classes.add(fqcn.replace('.', '/'))
+                package = None
+                names = []
+
+                # Bound as locals: the callback runs once per element
+                NAME_KEY = ANDROID_NAME
+                TAGS = COMPONENT_TAGS
+                add_name = names.append
+
+                def start(tag, attrs):
+                    nonlocal package
+                    if package is None:
+                        # First element is the <manifest> root
+                        package = attrs.get('package', '')
+                    elif tag in TAGS and (name := attrs.get(NAME_KEY)):
+                        add_name(name)
+
+                # Single expat pass with start callbacks only; no tree is built
+                parser = xml.parsers.expat.ParserCreate(namespace_separator=' ')
+                parser.StartElementHandler = start
+                with open(manifest_path, 'rb') as f:
+                    parser.ParseFile(f)
+                package = package or ''
+                for name in names:
+                    # Handle fully qualified and relative class names
+                    if name.startswith('.'):
+                        fqcn = package + name
+                    elif '.' in name:
+                        fqcn = name
+                    else:
+                        fqcn = package + '.' + name
+                    referenced_classes.add(fqcn.replace('.', '/'))
             except Exception as e:
                 print(f"Warning: Could not parse manifest for Java class extraction: {e}")
 
+        # Index referenced paths by file name so most files are rejected by one dict lookup
+        referenced_paths = {cls + '.java' for cls in referenced_classes}
+        suffix_index: Dict[str, List[str]] = {}
+        for ref in referenced_paths:
+            suffix_index.setdefault(ref.rsplit('/', 1)[-1], []).append(ref)
+
         copied_count = 0
-        # Find all Java files in sources directories, but only copy those referenced in manifest
-        for sources_dir in self.jadx_output_dir.rglob("sources"):
-            if sources_dir.is_dir():
-                for java_file in sources_dir.rglob("*.java"):
-                    rel_path = java_file.relative_to(sources_dir)
-                    # Remove .java extension and check if path matches any referenced class
-                    rel_path_no_ext = str(rel_path.with_suffix(''))
-                    if any(rel_path_no_ext.endswith(cls) for cls in referenced_classes):
-                        safe_name = str(rel_path).replace(os.sep, "_")
-                        dest_file = java_dest_dir / safe_name
-                        shutil.copy2(java_file, dest_file)
-                        copied_count += 1
-
-        print(f"✅ Copied {copied_count} Java files referenced in AndroidManifest.xml")
-
-    def _copy_xml_config_files(self):
-        """Copy XML configuration files (strings.xml, backup_rules.xml, etc.)"""
+        # Only copy Java files from sources directories that are referenced in manifest
+        for java_file, rel_path in java_files:
+            candidates = suffix_index.get(os.path.basename(java_file))
+            if not candidates:
+                continue
+            key = rel_path.replace(os.sep, '/')
+            if key in referenced_paths or any(key.endswith('/' + ref) for ref in candidates):
+                safe_name = rel_path.replace(os.sep, "_")
+                dest_file = java_dest_dir / safe_name
+                copy_jobs[dest_file] = java_file
+                copied_count += 1
+
+        return copied_count
+
+    def _copy_xml_config_files(self, collected: Dict[str, list], copy_jobs: Dict[Path, str]) -> Dict[str, int]:
+        """Queue copies of XML configuration files (strings.xml, backup_rules.xml, etc.)"""
         xml_dest_dir = self.base_directory / "XML_Files"
         xml_dest_dir.mkdir(exist_ok=True)
         
-        total_copied = 0
+        counts = {}
         
         # Copy default strings.xml
         strings_path = self.jadx_output_dir / "resources" / "res" / "values" / "strings.xml"
         if strings_path.exists():
-            shutil.copy2(strings_path, xml_dest_dir / "strings.xml")
-            total_copied += 1
-            print("✅ Copied strings.xml")
+            copy_jobs[xml_dest_dir / "strings.xml"] = str(strings_path)
+            counts['strings.xml'] = 1
         
         # Copy other XML configuration files
-        xml_patterns = {
-            'backup_rules.xml': r'backup_rules\.xml',
-            'data_extraction_rules.xml': r'data_extraction_rules\.xml'
-        }
-        
-        for xml_type, pattern in xml_patterns.items():
-            regex_pattern = re.compile(pattern)
+        for xml_type in XML_CONFIG_FILES:
             copied_count = 0
             
-            for root, _, files in os.walk(self.jadx_output_dir):
-                for file in files:
-                    if regex_pattern.search(file):
-                        source_file = Path(root) / file
-                        rel_path = source_file.relative_to(self.jadx_output_dir)
-                        safe_path = str(rel_path.parent).replace(os.sep, "_")
-                        dest_filename = f"{safe_path}_{file}" if safe_path != "." else file
-                        destination = xml_dest_dir / dest_filename
-                        
-                        shutil.copy2(source_file, destination)
-                        copied_count += 1
+            for source_file in collected[xml_type]:
+                source_file = Path(source_file)
+                file = source_file.name
+                rel_path = source_file.relative_to(self.jadx_output_dir)
+                safe_path = str(rel_path.parent).replace(os.sep, "_")
+                dest_filename = f"{safe_path}_{file}" if safe_path != "." else file
+                copy_jobs[xml_dest_dir / dest_filename] = str(source_file)
+                copied_count += 1
             
-            total_copied += copied_count
-            if copied_count > 0:
-                print(f"✅ Copied {copied_count} {xml_type} files")
+            counts[xml_type] = copied_count
         
-        print(f"✅ Total XML configuration files copied: {total_copied}")
+        return counts
 
     def cleanup_temp_dirs(self):
         """Clean up temporary directories created during APK analysis"""
@@ -262,22 +447,28 @@ class AndroidSecurityAnalyzer:
         response = response.strip()
         
         # Try to find JSON in markdown code blocks
-        json_match = re.search(r'```(?:json)?\s*(\[.*?\]|\{.*?\})\s*```', response, re.DOTALL | re.IGNORECASE)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
+        span = None
+        fence = response.find('```')
+        if fence != -1:
+            body = fence + 3
+            if response[body:body + 4].lower() == 'json':
+                body += 4
+            fence_end = response.find('```', body)
+            if fence_end != -1:
+                span = _find_json_span(response, body, fence_end)
+        if span is None:
             # Look for JSON arrays or objects in the response
-            json_match = re.search(r'(\[.*?\]|\{.*?\})', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # If no JSON found, return the raw response
-                return {"raw_response": response}
+            span = _find_json_span(response)
+        if span is None:
+            # If no JSON found, return the raw response
+            return {"raw_response": response}
+        json_str = response[span[0]:span[1]]
         
         try:
             # Clean up common JSON issues
             json_str = json_str.replace('\\"', '"').replace('\\n', '\n').replace('\\/', '/')
-            return json.loads(json_str)
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            return orjson.loads(json_str) if orjson is not None else json.loads(json_str)
         except json.JSONDecodeError as e:
             # If parsing fails, return structured error
             return {
@@ -285,16 +476,32 @@ class AndroidSecurityAnalyzer:
                 "raw_response": response
             }
 
+    def _groq_client(self) -> httpx.AsyncClient:
+        """Return the shared keep-alive client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=GROQ_BASE_URL,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.groq_api_key}"
+                },
+                timeout=60.0,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=2 * GROQ_CONCURRENCY)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def analyze_with_groq(self, prompt: str, system_message: str = "You are a security expert specialized in Android app vulnerabilities.", max_retries: int = 3) -> dict:
         """Generic method to analyze content using Groq API with rate limiting and retry logic"""
         if not self.groq_api_key:
             return {"error": "AI analysis skipped - no API key provided"}
             
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.groq_api_key}"
-        }
-
         payload = {
             "model": "llama3-8b-8192",
             "messages": [
@@ -311,12 +518,10 @@ class AndroidSecurityAnalyzer:
                     print(f"   ⏳ Rate limit hit, waiting {wait_time} seconds before retry {attempt + 1}/{max_retries}")
                     await asyncio.sleep(wait_time)
                 
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(
-                        "https://api.groq.com/openai/v1/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
+                response = await self._groq_client().post(
+                    "/openai/v1/chat/completions",
+                    json=payload
+                )
                 
                 if response.status_code == 429:
                     # Rate limited, try again
@@ -340,21 +545,53 @@ class AndroidSecurityAnalyzer:
         
         return {"error": "Failed to analyze after multiple retries due to rate limiting"}
 
+    async def analyze_prompts(self, prompts: List[str]) -> List[Any]:
+        """Run analyze_with_groq over all prompts concurrently, bounded by GROQ_CONCURRENCY"""
+        if self._groq_semaphore is None:
+            self._groq_semaphore = asyncio.Semaphore(GROQ_CONCURRENCY)
+
+        async def analyze_one(prompt: str):
+            async with self._groq_semaphore:
+                return await self.analyze_with_groq(prompt)
+
+        return await asyncio.gather(*(analyze_one(prompt) for prompt in prompts))
+
+    def iter_files_by_pattern(self, pattern: str) -> Iterator[Path]:
+        """Lazily yield files matching a pattern in the base directory"""
+        # Every caller uses "**/<name glob>", so matching on the file name is enough
+        name_pattern = pattern.rsplit('/', 1)[-1]
+        if self._base_files is not None:
+            for name, path in self._base_files:
+                if fnmatch.fnmatchcase(name, name_pattern):
+                    yield Path(path)
+            return
+        # First lookup streams the walk and keeps the listing for later calls
+        listing = []
+        for name, path, is_file in _walk_once(self.base_directory):
+            if not is_file:
+                continue
+            listing.append((name, path))
+            if fnmatch.fnmatchcase(name, name_pattern):
+                yield Path(path)
+        self._base_files = listing
+
     def find_files_by_pattern(self, pattern: str) -> List[Path]:
         """Find files matching a pattern in the base directory"""
-        files = []
-        for file_path in self.base_directory.rglob(pattern):
-            if file_path.is_file():
-                files.append(file_path)
-        return files
+        return list(self.iter_files_by_pattern(pattern))
 
     def read_file_content(self, file_path: Path) -> str:
-        """Read file content with error handling"""
+        """Read file content with error handling, caching XML files"""
+        key = os.fspath(file_path)
+        cached = self._xml_content_cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            with open(file_path, "r", encoding="utf-8", errors='ignore') as f:
-                return f.read()
+            content = Path(file_path).read_bytes().decode("utf-8", "ignore")
         except Exception as e:
             return f"Error reading file: {str(e)}"
+        if key.endswith('.xml'):
+            self._xml_content_cache[key] = content
+        return content
 
     async def analyze_android_manifest(self) -> dict:
         """Analyze AndroidManifest.xml files"""
@@ -362,6 +599,7 @@ class AndroidSecurityAnalyzer:
         manifest_files = self.find_files_by_pattern("**/AndroidManifest.xml")
         
         results = {"manifests_found": len(manifest_files), "analyses": []}
+        prompts = []
         
         for manifest_file in manifest_files:
             content = self.read_file_content(manifest_file)
@@ -383,16 +621,15 @@ AndroidManifest.xml content:
 
 Return only the JSON array, no additional text or formatting.
 """
-            
-            analysis = await self.analyze_with_groq(prompt)
+            prompts.append(prompt)
+        
+        analyses = await self.analyze_prompts(prompts)
+        for manifest_file, analysis in zip(manifest_files, analyses):
             results["analyses"].append({
                 "file": str(manifest_file.relative_to(self.base_directory)),
                 "issues": analysis if isinstance(analysis, list) else [analysis]
             })
             
-            # Add delay between API calls
-            await asyncio.sleep(1)
-            
         return results
 
     async def analyze_backup_and_extraction_rules(self) -> dict:
@@ -443,9 +680,6 @@ Return only the JSON array, no additional text or formatting.
                 "issues": analysis if isinstance(analysis, list) else [analysis]
             })
             
-            # Add delay between API calls
-            await asyncio.sleep(1)
-            
         return results
 
     async def analyze_strings_xml(self) -> dict:
@@ -454,6 +688,7 @@ Return only the JSON array, no additional text or formatting.
         
         strings_files = self.find_files_by_pattern("**/strings.xml")
         results = {"strings_files_found": len(strings_files), "analyses": []}
+        prompts = []
         
         for strings_file in strings_files:
             content = self.read_file_content(strings_file)
@@ -476,48 +711,43 @@ strings.xml content:
 
 Return only the JSON object, no additional text or formatting.
 """
-            
-            analysis = await self.analyze_with_groq(prompt)
+            prompts.append(prompt)
+        
+        analyses = await self.analyze_prompts(prompts)
+        for strings_file, analysis in zip(strings_files, analyses):
             results["analyses"].append({
                 "file": str(strings_file.relative_to(self.base_directory)),
                 "analysis": analysis
             })
             
-            # Add delay between API calls
-            await asyncio.sleep(1)
-            
         return results
 
     def find_hardcoded_strings_in_layouts(self) -> dict:
         """Find hardcoded strings in layout XML files"""
         print("🔍 Finding hardcoded strings in layout files...")
         
-        text_attrs = [
-            "text", "hint", "contentDescription", "title", "summary", 
-            "label", "subtitle", "message", "dialogTitle"
-        ]
+        results = {"xml_files_scanned": 0, "hardcoded_strings": {}}
         
-        pattern = re.compile(
-            r'(android:(' + '|'.join(text_attrs) + r'))="((?!@string/)[^"]+)"'
-        )
-        
-        xml_files = self.find_files_by_pattern("**/*.xml")
-        results = {"xml_files_scanned": len(xml_files), "hardcoded_strings": {}}
-        
-        for xml_file in xml_files:
+        for xml_file in self.iter_files_by_pattern("**/*.xml"):
+            results["xml_files_scanned"] += 1
             content = self.read_file_content(xml_file)
             file_results = []
             
-            for i, line in enumerate(content.split('\n'), 1):
-                match = pattern.search(line)
-                if match:
-                    attr = match.group(1)
-                    val = match.group(3)
-                    file_results.append({
-                        "attribute": attr,
-                        "value": val,
-                        "line": i
-                    })
+            line_no = 1
+            pos = 0
+            last_line = 0
+            for match in _HARDCODED_ATTR_RE.finditer(content):
+                line_no += content.count('\n', pos, match.start())
+                pos = match.start()
+                # Report only the first hit per line, as the line-by-line scan did
+                if line_no == last_line:
+                    continue
+                last_line = line_no
+                file_results.append({
+                    "attribute": match.group(1),
+                    "value": match.group(3),
+                    "line": line_no
+                })
             
             if file_results:
                 results["hardcoded_strings"][str(xml_file.relative_to(self.base_directory))] = file_results
@@ -527,25 +757,9 @@ Return only the JSON object, no additional text or formatting.
             
         return results
 
-    async def analyze_java_files(self) -> dict:
-        """Analyze Java source files for security vulnerabilities with rate limit protection"""
-        print("🔍 Analyzing Java source files...")
-        
-        java_files = self.find_files_by_pattern("**/*.java")
-        results = {"java_files_found": len(java_files), "analyses": []}
-        
-        if not java_files:
-            return results
-        
-        # Process files one at a time with delays
-        for java_file in java_files:
-            content = self.read_file_content(java_file)
-            
-            # Truncate very long files to avoid token limits
-            if len(content) > 4000:  # Reduced limit for single file analysis
-                content = content[:4000] + "\n... [FILE TRUNCATED] ..."
-            
-            prompt = f"""
+    def _java_file_prompt(self, content: str) -> str:
+        """Build the single-file Java vulnerability prompt"""
+        return f"""
     Analyze the Java source file for security vulnerabilities.
 
     Return ONLY a JSON array of vulnerability objects with this exact structure:
@@ -564,22 +778,103 @@ Return only the JSON object, no additional text or formatting.
 
     Return only the JSON array, no additional text or formatting.
     """
+
+    def _java_batch_prompt(self, batch: List[Tuple[str, str]]) -> str:
+        """Build one prompt covering several Java files, keyed by file path"""
+        files = "".join(f"=== FILE: {name} ===\n{content}\n" for name, content in batch)
+        return f"""
+    Analyze each of the following Java source files for security vulnerabilities.
+
+    Return ONLY a JSON object mapping each file path exactly as given after "=== FILE:" to a JSON array of vulnerability objects with this exact structure:
+    {{
+    "path/to/File.java": [
+        {{
+            "file": "filename.java",
+            "vulnerability_type": "Vulnerability category",
+            "code_snippet": "Relevant code",
+            "description": "Detailed explanation",
+            "severity": "High/Medium/Low"
+        }}
+    ]
+    }}
+
+    Include every file, using an empty array when a file has no issues.
+
+    {files}
+    Return only the JSON object, no additional text or formatting.
+    """
+
+    async def analyze_java_files(self) -> dict:
+        """Analyze Java source files for security vulnerabilities, several files per request"""
+        print("🔍 Analyzing Java source files...")
+        
+        java_files = self.find_files_by_pattern("**/*.java")
+        results = {"java_files_found": len(java_files), "analyses": []}
+        
+        if not java_files:
+            return results
+        
+        entries = []
+        for java_file in java_files:
+            content = self.read_file_content(java_file)
             
-            # Use the existing analyze_with_groq method which already has retry logic
-            analysis = await self.analyze_with_groq(prompt)
+            # Truncate very long files to avoid token limits
+            if len(content) > JAVA_FILE_CHARS:
+                content = content[:JAVA_FILE_CHARS] + "\n... [FILE TRUNCATED] ..."
             
+            entries.append((str(java_file.relative_to(self.base_directory)), content))
+        
+        # Pack files into batches of roughly JAVA_BATCH_TOKENS (~4 chars per token)
+        batches = []
+        current = []
+        current_tokens = 0
+        for name, content in entries:
+            tokens = len(content) // 4
+            if current and current_tokens + tokens > JAVA_BATCH_TOKENS:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append((name, content))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        
+        prompts = [
+            self._java_file_prompt(batch[0][1]) if len(batch) == 1 else self._java_batch_prompt(batch)
+            for batch in batches
+        ]
+        
+        # analyze_with_groq already retries with backoff on 429s
+        vulnerabilities = {}
+        retry = []
+        for batch, analysis in zip(batches, await self.analyze_prompts(prompts)):
+            if len(batch) == 1 or (isinstance(analysis, dict) and "error" in analysis):
+                # Single-file answers and request errors apply to every file in the batch
+                for name, _ in batch:
+                    vulnerabilities[name] = analysis if isinstance(analysis, list) else [analysis]
+                continue
+            if not isinstance(analysis, dict):
+                # Issues not keyed by file cannot be attributed; ask about each file on its own
+                retry.extend(batch)
+                continue
+            for name, content in batch:
+                issues = analysis.get(name)
+                if isinstance(issues, list):
+                    vulnerabilities[name] = issues
+                else:
+                    retry.append((name, content))
+        
+        if retry:
+            # Files the model skipped in a batch answer are asked about individually
+            analyses = await self.analyze_prompts([self._java_file_prompt(content) for _, content in retry])
+            for (name, _), analysis in zip(retry, analyses):
+                vulnerabilities[name] = analysis if isinstance(analysis, list) else [analysis]
+        
+        for name, _ in entries:
             results["analyses"].append({
-                "file": str(java_file.relative_to(self.base_directory)),
-                "vulnerabilities": analysis if isinstance(analysis, list) else [analysis]
+                "file": name,
+                "vulnerabilities": vulnerabilities[name]
             })
-            
-            # Add delay between files (2 seconds minimum)
-            await asyncio.sleep(2)
-            
-            # If we hit a rate limit in the last analysis, extend the delay
-            if isinstance(analysis, dict) and "error" in analysis and "Rate limit" in analysis["error"]:
-                print("⚠️  Rate limit detected, increasing delay to 10 seconds")
-                await asyncio.sleep(10)
         
         return results
 
@@ -641,10 +936,22 @@ Return only the JSON object, no additional text or formatting.
         }
         return summary
 
+    async def iter_security_analysis(self):
+        """Yield (stage, result) pairs as each security analysis finishes"""
+        yield "manifest_analysis", await self.analyze_android_manifest()
+        
+        yield "backup_extraction_analysis", await self.analyze_backup_and_extraction_rules()
+        
+        yield "strings_analysis", await self.analyze_strings_xml()
+        
+        yield "hardcoded_strings_analysis", self.find_hardcoded_strings_in_layouts()
+        
+        yield "java_analysis", await self.analyze_java_files()
+
     async def run_security_analysis(self) -> dict:
         """Run all security analyses"""
         print(f"🚀 Starting security analysis of: {self.base_directory}")
-        print("⏳ Note: Adding delays between API calls to avoid rate limiting")
+        print(f"⏳ Note: Running up to {GROQ_CONCURRENCY} AI requests concurrently")
         print("=" * 80)
         
         if not self.base_directory.exists():
@@ -652,20 +959,10 @@ Return only the JSON object, no additional text or formatting.
         
         all_results = {}
         
-        # Run all analyses with delays
+        # Run all analyses
         try:
-            all_results["manifest_analysis"] = await self.analyze_android_manifest()
-            await asyncio.sleep(2)
-            
-            all_results["backup_extraction_analysis"] = await self.analyze_backup_and_extraction_rules()
-            await asyncio.sleep(2)
-            
-            all_results["strings_analysis"] = await self.analyze_strings_xml()
-            await asyncio.sleep(2)
-            
-            all_results["hardcoded_strings_analysis"] = self.find_hardcoded_strings_in_layouts()
-            
-            all_results["java_analysis"] = await self.analyze_java_files()
+            async for stage, result in self.iter_security_analysis():
+                all_results[stage] = result
             
         except Exception as e:
             print(f"❌ Error during analysis: {str(e)}")
@@ -690,7 +987,7 @@ Return only the JSON object, no additional text or formatting.
                 print("=" * 60)
                 
                 # Step 1: JADX Decompilation
-                if not self.step1_jadx_decompile():
+                if not await self.step1_jadx_decompile():
                     return {"error": "JADX decompilation failed"}
 
                 # Step 2: Setup Analysis Directory
@@ -714,6 +1011,50 @@ Return only the JSON object, no additional text or formatting.
         except Exception as e:
             print(f"\n❌ Error during analysis: {e}")
             return {"error": str(e)}
+        finally:
+            await self.aclose()
+
+def _validate_apk_path(apk_path: str):
+    """Raise FileNotFoundError/ValueError unless apk_path is an existing .apk file"""
+    if not os.path.isfile(apk_path):
+        raise FileNotFoundError(f"APK file '{apk_path}' not found.")
+    
+    if not apk_path.lower().endswith('.apk'):
+        raise ValueError(f"File '{apk_path}' is not an APK file (must have .apk extension).")
+
+async def iter_findings(apk_path: str):
+    """
+    Analyze an APK file, yielding {"stage": ..., "result": ...} records as each step finishes.
+    
+    The last record is the scan summary. Raises like analyze_apk_file on invalid input.
+    """
+    _validate_apk_path(apk_path)
+    analyzer = AndroidSecurityAnalyzer(apk_path, is_apk=True)
+    
+    try:
+        if not await analyzer.step1_jadx_decompile():
+            yield {"stage": "error", "result": {"error": "JADX decompilation failed"}}
+            return
+        if not analyzer.step2_setup_analysis_directory():
+            yield {"stage": "error", "result": {"error": "Failed to setup analysis directory"}}
+            return
+        
+        all_results = {}
+        try:
+            async for stage, result in analyzer.iter_security_analysis():
+                all_results[stage] = result
+                yield {"stage": stage, "result": result}
+        except Exception as e:
+            print(f"❌ Error during analysis: {str(e)}")
+            all_results["analysis_error"] = str(e)
+            yield {"stage": "analysis_error", "result": {"error": str(e)}}
+        
+        summary = analyzer.generate_summary_report(all_results)
+        yield {"stage": "summary", "result": summary["scan_summary"]}
+    
+    finally:
+        await analyzer.aclose()
+        analyzer.cleanup_temp_dirs()
 
 async def analyze_apk_file(apk_path: str) -> dict:
     """
@@ -729,12 +1070,7 @@ async def analyze_apk_file(apk_path: str) -> dict:
         FileNotFoundError: If the APK file doesn't exist
         ValueError: If the file is not an APK file
     """
-    # Validate input
-    if not os.path.isfile(apk_path):
-        raise FileNotFoundError(f"APK file '{apk_path}' not found.")
-    
-    if not apk_path.lower().endswith('.apk'):
-        raise ValueError(f"File '{apk_path}' is not an APK file (must have .apk extension).")
+    _validate_apk_path(apk_path)
     
     # Create analyzer and run analysis
     analyzer = AndroidSecurityAnalyzer(apk_path, is_apk=True)
@@ -799,8 +1135,12 @@ async def main():
     input_name = Path(input_path).stem
     output_file = f"{input_name}_security_analysis.json"
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            # orjson always emits UTF-8, matching ensure_ascii=False
+            Path(output_file).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
         print(f"\n📄 Results saved to: {output_file}")
     except Exception as e:
         print(f"❌ Error saving results: {str(e)}")
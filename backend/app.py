@@ -1,3 +1,4 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from routes.review_routes import review_bp
@@ -7,6 +8,8 @@ from routes.solidity_route import solidity_bp
 from routes.android_route import apk_analyzer_bp
 
 app = Flask(__name__)
+# Upper bound for request bodies; APK uploads are streamed to disk below this size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '512')) * 1024 * 1024
 
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
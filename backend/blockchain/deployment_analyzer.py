@@ -1,8 +1,13 @@
 import json
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, Dict, Any
+import rlp
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
-from eth_utils import to_checksum_address, is_address
+from eth_utils import to_checksum_address, is_address, keccak, to_bytes
 
 # Middleware import for POA chains (Ganache etc)
 try:
@@ -14,6 +19,28 @@ except ImportError:
         geth_poa_middleware = None
         print("Warning: POA middleware not available - some Ganache features may be limited")
 
+BLOCK_SCAN_DEPTH = 100
+RPC_WORKERS = 16
+
+@lru_cache(maxsize=8)
+def _get_w3(rpc_url: str) -> Web3:
+    """Shared Web3 per RPC URL so analyzers reuse pooled keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=RPC_WORKERS * 2, pool_maxsize=RPC_WORKERS * 2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    w3 = Web3(Web3.HTTPProvider(rpc_url, session=session))
+
+    if geth_poa_middleware:
+        w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    else:
+        print("Running without POA middleware - using basic connection")
+    return w3
+
+def predict_create_address(sender: str, nonce: int) -> str:
+    """Address deployed by a CREATE from sender at nonce: keccak(rlp([sender, nonce]))[12:]"""
+    return to_checksum_address(keccak(rlp.encode([to_bytes(hexstr=sender), nonce]))[12:])
+
 class DeploymentAnalyzer:
     def __init__(self, contract_address: Optional[str] = None, rpc_url: Optional[str] = None):
         if contract_address and not is_address(contract_address):
@@ -21,12 +48,7 @@ class DeploymentAnalyzer:
             
         self.contract_address = to_checksum_address(contract_address) if contract_address else None
         self.rpc_url = rpc_url or "http://localhost:8545"
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        
-        if geth_poa_middleware:
-            self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-        else:
-            print("Running without POA middleware - using basic connection")
+        self.w3 = _get_w3(self.rpc_url)
         
         if not self.w3.isConnected():
             raise ConnectionError(
@@ -57,7 +79,7 @@ class DeploymentAnalyzer:
             if not creation_tx:
                 self.report["errors"].append({
                     "source": "deployment",
-                    "error": "Creation transaction not found in last 100 blocks"
+                    "error": "Creation transaction not found"
                 })
                 return
 
@@ -82,16 +104,62 @@ class DeploymentAnalyzer:
     def _get_creation_transaction(self):
         try:
             latest = self.w3.eth.block_number
-            # Search last 100 blocks for creation tx of this contract
-            for block_num in range(latest, max(0, latest - 100), -1):
-                block = self.w3.eth.get_block(block_num, full_transactions=True)
-                for tx in block.transactions:
-                    if tx.to is None:
-                        receipt = self.w3.eth.get_transaction_receipt(tx.hash)
-                        if receipt.contractAddress == self.contract_address:
-                            return tx
         except Exception:
             return None
+        try:
+            block_num = self._find_deployment_block(latest)
+        except Exception:
+            # Nodes without historical state cannot answer eth_getCode at old blocks
+            return self._scan_recent_blocks(latest)
+        if block_num is None:
+            return None
+        # Only hashes for the deployment block; transactions are fetched until the match
+        executor = ThreadPoolExecutor(max_workers=RPC_WORKERS)
+        try:
+            tx_hashes = self.w3.eth.get_block(block_num, full_transactions=False).transactions
+            return self._find_creation(executor.map(self.w3.eth.get_transaction, tx_hashes))
+        except Exception:
+            return None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _find_deployment_block(self, latest: int) -> Optional[int]:
+        """Binary-search eth_getCode for the first block where the contract has code"""
+        if not self.w3.eth.get_code(self.contract_address, block_identifier=latest):
+            return None
+        lo, hi = 0, latest
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.w3.eth.get_code(self.contract_address, block_identifier=mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _find_creation(self, transactions):
+        for tx in transactions:
+            # Only a creation whose deterministic address matches needs its receipt checked
+            if tx.to is None and predict_create_address(tx["from"], tx.nonce) == self.contract_address:
+                receipt = self.w3.eth.get_transaction_receipt(tx.hash)
+                if receipt.contractAddress == self.contract_address:
+                    return tx
+        return None
+
+    def _scan_recent_blocks(self, latest: int):
+        # RPC calls are fanned out over a thread pool so the round-trips overlap
+        executor = ThreadPoolExecutor(max_workers=RPC_WORKERS)
+        try:
+            # Search last 100 blocks for creation tx of this contract, newest first
+            block_numbers = range(latest, max(0, latest - BLOCK_SCAN_DEPTH), -1)
+            blocks = executor.map(lambda n: self.w3.eth.get_block(n, full_transactions=True), block_numbers)
+            for block in blocks:
+                tx = self._find_creation(block.transactions)
+                if tx:
+                    return tx
+        except Exception:
+            return None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def generate_report(self, output_file: Optional[str] = None) -> Dict[str, Any]:
         if self.contract_address:
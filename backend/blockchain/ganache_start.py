@@ -1,18 +1,57 @@
+import hashlib
+import json
 import subprocess
 import time
+from pathlib import Path
 from web3 import Web3
-from solcx import compile_source
+from solcx import compile_source, get_solc_version
 from deployment_analyzer import DeploymentAnalyzer
 
-GANACHE_CMD = "ganache --chain.chainId 1337 --wallet.deterministic"
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GANACHE_CMD = ["ganache", "--chain.chainId", "1337", "--wallet.deterministic"]
 GANACHE_PORT = 8545
+STARTUP_TIMEOUT = 10
+SOLC_CACHE_DIR = Path("~/.cache/nullscan/solc").expanduser()
 
 def start_ganache():
     print("[*] Starting Ganache...")
-    return subprocess.Popen(GANACHE_CMD, shell=True, stdout=subprocess.DEVNULL)
+    return subprocess.Popen(GANACHE_CMD, stdout=subprocess.DEVNULL)
+
+def wait_for_ganache(w3, ganache_proc, timeout: float = STARTUP_TIMEOUT) -> bool:
+    # Poll the RPC endpoint instead of sleeping a fixed amount
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if ganache_proc.poll() is not None:
+            return False
+        if w3.isConnected():
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+    return w3.isConnected()
+
+def compile_cached(contract_source: str) -> dict:
+    # Compilation is a pure function of the source and compiler, so reuse artifacts across runs
+    key = hashlib.blake2b(f"{get_solc_version()}\n{contract_source}".encode()).hexdigest()
+    cache_path = SOLC_CACHE_DIR / f"{key}.json"
+    if cache_path.exists():
+        data = cache_path.read_bytes()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
 
-def deploy_contract(w3, contract_source: str):
     compiled_sol = compile_source(contract_source)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    data = orjson.dumps(compiled_sol) if orjson is not None else json.dumps(compiled_sol).encode()
+    tmp_path = cache_path.with_suffix(".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(cache_path)
+    return compiled_sol
+
+def deploy_contract(w3, contract_source: str):
+    compiled_sol = compile_cached(contract_source)
     contract_id, contract_interface = compiled_sol.popitem()
     
     acct = w3.eth.accounts[0]
@@ -24,12 +63,11 @@ def deploy_contract(w3, contract_source: str):
 
 def main():
     ganache_proc = start_ganache()
-    time.sleep(3)
 
     try:
         rpc_url = f"http://localhost:{GANACHE_PORT}"
         w3 = Web3(Web3.HTTPProvider(rpc_url))
-        if not w3.isConnected():
+        if not wait_for_ganache(w3, ganache_proc):
             raise Exception("Ganache not connected")
 
         print("[*] Compiling and deploying contract...")
@@ -1,13 +1,39 @@
-import subprocess
+import asyncio
 import os
 import datetime
 import json
 import sys
+import importlib.util
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 import google.generativeai as genai
+from ai.llm_cache import cache_key, cache_get, cache_set
 
-GEMINI_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+MODEL_NAME = 'gemini-2.0-flash'
+# Concurrent Gemini requests per analysis
+PATCH_CONCURRENCY = 5
+PATCH_UNAVAILABLE = "Could not generate patch"
+# Batched answers must fit one response; size batches by a rough per-finding output estimate
+PATCH_BATCH_OUTPUT_TOKENS = 6144
+PATCH_TOKENS_PER_FINDING = 768
+PATCHES_PER_BATCH = PATCH_BATCH_OUTPUT_TOKENS // PATCH_TOKENS_PER_FINDING
+
+@lru_cache(maxsize=1)
+def _model():
+  # Configured on first use so the app can be imported without an API key
+  api_key = os.environ.get("GOOGLE_API_KEY")
+  if not api_key:
+    raise RuntimeError("GOOGLE_API_KEY is not set")
+  genai.configure(api_key=api_key)
+  return genai.GenerativeModel(MODEL_NAME)
 
 def get_current_timestamp():
   return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -20,26 +46,81 @@ def read_contract_code(filepath):
     print(f"❌ Error reading contract file: {str(e)}")
     return None
 
-def run_slither(contract_file, output_file="analysis_report.json"):
+SLITHER_ARGS = ("--json", "-")
+
+def parse_slither_output(stdout, stderr):
+  # Slither exits non-zero whenever detectors fire, so judge by the JSON instead
+  try:
+    slither_results = orjson.loads(stdout) if orjson is not None else json.loads(stdout)
+  except ValueError:
+    slither_results = None
+  if not isinstance(slither_results, dict) or "results" not in slither_results:
+    print("⚠️ Slither did not produce JSON output.")
+    print(stderr.decode(errors="replace"))
+    return None
+  return slither_results
+
+# Long-lived workers keep slither/crytic-compile imported between analyses
+SLITHER_WORKERS = int(os.environ.get("SLITHER_WORKERS", os.cpu_count() or 1))
+SLITHER_IN_PROCESS = SLITHER_WORKERS > 0 and importlib.util.find_spec("slither") is not None
+
+_detector_classes = ()
+
+def _init_slither_worker():
+  global _detector_classes
+  from slither.detectors import all_detectors
+  from slither.detectors.abstract_detector import AbstractDetector
+  _detector_classes = tuple(
+    d for d in vars(all_detectors).values()
+    if inspect.isclass(d) and issubclass(d, AbstractDetector) and d is not AbstractDetector
+  )
+
+def _slither_in_worker(contract_file):
+  from slither import Slither
+  slither = Slither(contract_file)
+  for detector in _detector_classes:
+    slither.register_detector(detector)
+  # Same shape as the CLI's "--json" report
+  detectors = [result for results in slither.run_detectors() for result in results]
+  return {"success": True, "error": None, "results": {"detectors": detectors}}
+
+@lru_cache(maxsize=1)
+def _slither_pool():
+  # Created from a threaded server worker, where fork() could copy held locks into the child
+  return ProcessPoolExecutor(
+    max_workers=SLITHER_WORKERS,
+    initializer=_init_slither_worker,
+    mp_context=multiprocessing.get_context("forkserver")
+  )
+
+async def run_slither_async(contract_file):
+  if SLITHER_IN_PROCESS:
+    try:
+      return await asyncio.get_running_loop().run_in_executor(_slither_pool(), _slither_in_worker, contract_file)
+    except BrokenProcessPool as e:
+      # A crashed worker breaks the pool for good; start a fresh one for the next analysis
+      _slither_pool.cache_clear()
+      print(f"⚠️ Slither worker pool broke, restarting it and falling back to the CLI: {str(e)}")
+    except Exception as e:
+      print(f"⚠️ Slither worker failed, falling back to the CLI: {str(e)}")
+  return await _run_slither_cli_async(contract_file)
+
+async def _run_slither_cli_async(contract_file):
+  # "--json -" writes the report to stdout; logs stay on stderr
   try:
-    result = subprocess.run(
-      ["slither", contract_file, "--json", output_file],
-      stdout=subprocess.PIPE,
-      stderr=subprocess.PIPE,
-      text=True
+    proc = await asyncio.create_subprocess_exec(
+      "slither", contract_file, *SLITHER_ARGS,
+      stdout=asyncio.subprocess.PIPE,
+      stderr=asyncio.subprocess.PIPE
     )
-    if os.path.isfile(output_file) and os.path.getsize(output_file) > 0:
-      return output_file
-    else:
-      print("⚠️ Slither did not produce JSON output.")
-      print(result.stderr)
-      return None
-  except subprocess.CalledProcessError as e:
-    print(f"❌ Slither error: {e.stderr}")
+    stdout, stderr = await proc.communicate()
+  except OSError as e:
+    print(f"❌ Slither error: {str(e)}")
     return None
+  return parse_slither_output(stdout, stderr)
 
-def get_ai_patch(contract_code, vulnerability):
-  prompt = f"""
+def build_patch_prompt(contract_code, vulnerability):
+  return f"""
 I have a Solidity smart contract with the following vulnerability:
 {vulnerability}
 
@@ -53,27 +134,105 @@ Please provide:
 
 Format your response with clear headings for each section.
 """
+
+async def get_ai_patch_async(contract_code, vulnerability, semaphore):
+  prompt = build_patch_prompt(contract_code, vulnerability)
+  # Repeat scans of the same contract reuse the shared on-disk LLM cache
+  key = cache_key(MODEL_NAME, None, prompt)
+  cached = cache_get(key)
+  if cached is not None:
+    return cached
+  async with semaphore:
+    try:
+      response = await _model().generate_content_async(prompt)
+      cache_set(key, response.text)
+      return response.text
+    except Exception as e:
+      print(f"❌ Gemini AI error: {str(e)}")
+      return None
+
+def build_batch_patch_prompt(contract_code, descriptions):
+  findings = "".join(f"=== VULNERABILITY {i} ===\n{description}\n\n" for i, description in enumerate(descriptions, 1))
+  return f"""
+I have a Solidity smart contract with the following vulnerabilities:
+{findings}
+Here is the contract code:
+{contract_code}
+
+For each vulnerability, please provide:
+1. A short explanation of the vulnerability
+2. A minimal patch: a unified diff, or only the changed lines with a few lines of context.
+   Do not repeat the whole contract.
+3. Security best practices to prevent this issue
+
+Return ONLY a JSON object mapping each vulnerability number (as a string, e.g. "1") to its response text,
+formatted with clear headings for each section.
+"""
+
+def parse_batch_patches(raw, count):
   try:
-    response = model.generate_content(prompt)
-    return response.text
-  except Exception as e:
-    print(f"❌ Gemini AI error: {str(e)}")
+    parsed = orjson.loads(raw) if orjson is not None else json.loads(raw)
+  except ValueError:
+    return None
+  if not isinstance(parsed, dict):
     return None
+  patches = []
+  for i in range(1, count + 1):
+    patch = parsed.get(str(i))
+    patches.append(patch if isinstance(patch, str) and patch.strip() else None)
+  return patches
 
-def analyze_and_patch(contract_file):
-  output_file = run_slither(contract_file)
-  if not output_file:
-    return {"error": "Slither analysis failed."}
+async def get_ai_patches_batched(contract_code, descriptions):
+  # Each request carries the contract once for a batch of findings; per-finding calls are the fallback
+  batches = [descriptions[i:i + PATCHES_PER_BATCH] for i in range(0, len(descriptions), PATCHES_PER_BATCH)]
+  results = await asyncio.gather(*(_get_patch_batch(contract_code, batch) for batch in batches))
+  return [patch for batch in results for patch in batch]
 
-  try:
-    with open(output_file, 'r') as f:
-      slither_results = json.load(f)
-  except Exception as e:
-    return {"error": f"Error reading Slither results: {str(e)}"}
+async def _get_patch_batch(contract_code, descriptions):
+  if len(descriptions) <= 1:
+    return await get_ai_patches(contract_code, descriptions)
 
-  contract_code = read_contract_code(contract_file)
-  if not contract_code:
-    return {"error": "Failed to read contract code."}
+  prompt = build_batch_patch_prompt(contract_code, descriptions)
+  key = cache_key(MODEL_NAME, None, prompt)
+  raw = cache_get(key)
+  fresh = raw is None
+  if fresh:
+    try:
+      response = await _model().generate_content_async(
+        prompt,
+        generation_config={
+          "response_mime_type": "application/json",
+          "max_output_tokens": PATCH_BATCH_OUTPUT_TOKENS
+        }
+      )
+      raw = response.text
+    except Exception as e:
+      print(f"❌ Gemini AI error: {str(e)}")
+      raw = None
+
+  patches = parse_batch_patches(raw, len(descriptions)) if raw else None
+  if patches is None:
+    return await get_ai_patches(contract_code, descriptions)
+  if fresh:
+    cache_set(key, raw)
+
+  missing = [i for i, patch in enumerate(patches) if patch is None]
+  if missing:
+    retried = await get_ai_patches(contract_code, [descriptions[i] for i in missing])
+    for i, patch in zip(missing, retried):
+      patches[i] = patch
+  return patches
+
+async def get_ai_patches(contract_code, descriptions):
+  semaphore = asyncio.Semaphore(PATCH_CONCURRENCY)
+  return await asyncio.gather(
+    *(get_ai_patch_async(contract_code, description, semaphore) for description in descriptions)
+  )
+
+async def analyze_and_patch_async(contract_file):
+  slither_results = await run_slither_async(contract_file)
+  if not slither_results:
+    return {"error": "Slither analysis failed."}
 
   detectors = slither_results.get('results', {}).get('detectors', [])
   result_summary = {
@@ -81,16 +240,30 @@ def analyze_and_patch(contract_file):
     "timestamp": get_current_timestamp(),
     "vulnerabilities": []
   }
+  # Clean contracts need neither the source nor any patches
+  if not detectors:
+    return result_summary
+
+  contract_code = read_contract_code(contract_file)
+  if not contract_code:
+    return {"error": "Failed to read contract code."}
+
+  # Identical findings share one patch; distinct ones are batched into a single request
+  descriptions = list(dict.fromkeys(detector.get("description", "") for detector in detectors))
+  patches = dict(zip(descriptions, await get_ai_patches_batched(contract_code, descriptions)))
 
   for i, detector in enumerate(detectors, 1):
     description = detector.get("description", "")
-    patch = get_ai_patch(contract_code, description)
+    patch = patches[description]
     result_summary["vulnerabilities"].append({
       "id": i,
       "type": detector.get("check", "N/A"),
       "impact": detector.get("impact", "N/A"),
       "description": description,
-      "patch": patch or "Could not generate patch"
+      "patch": patch or PATCH_UNAVAILABLE
     })
 
   return result_summary
+
+def analyze_and_patch(contract_file):
+  return asyncio.run(analyze_and_patch_async(contract_file))
@@ -0,0 +1,26 @@
+# gunicorn -c gunicorn.conf.py wsgi:app  (run from backend/)
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# LLM, Slither and nmap calls are I/O bound, so threads overlap them within each worker
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get("THREADS", 8))
+
+# APK and Slither analyses can run for minutes
+timeout = 600
+graceful_timeout = 30
+
+# Import the app once in the master; workers fork from it
+preload_app = True
+
+# Recycle workers periodically to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+# Every worker owns its own Slither process pool; keep the total process count sane
+os.environ.setdefault("SLITHER_WORKERS", "2")
+# Provider rate limits (GEMINI_*, OPENAI_*) are split evenly across this many workers
+os.environ.setdefault("WORKERS", str(workers))
@@ -1,12 +1,55 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, Response, current_app, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from werkzeug.utils import secure_filename
 import os
+import shutil
 import tempfile
 import asyncio
 from pathlib import Path
-from android.analyzer import analyze_apk_file  # Import from the provided analyzer.py
+from android.analyzer import analyze_apk_file, iter_findings  # Import from the provided analyzer.py
+from utils.orjson_response import orjson_response, ndjson_line
 
 apk_analyzer_bp = Blueprint('apk_analyzer', __name__, url_prefix='/api/apk-analyzer')
 
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def _receive_apk(temp_dir: str) -> Path:
+    """
+    Parse the multipart body with every file part written straight into temp_dir,
+    so the upload never sits in memory or a spooled tempfile. Returns the APK path.
+    """
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        return tempfile.NamedTemporaryFile(dir=temp_dir, delete=False)
+    
+    max_length = current_app.config.get('MAX_CONTENT_LENGTH')
+    if max_length is not None and (request.content_length or 0) > max_length:
+        raise UploadError('APK file is too large', 413)
+    
+    try:
+        _, _, files = parse_form_data(request.environ, stream_factory=stream_factory, max_content_length=max_length)
+    except RequestEntityTooLarge:
+        raise UploadError('APK file is too large', 413)
+    
+    for upload in files.values():
+        upload.stream.close()
+    
+    file = files.get('apk_file')
+    if file is None:
+        raise UploadError('No APK file provided')
+    
+    # Validate file extension on the sanitized name, which is also what lands on disk
+    filename = secure_filename(file.filename or '')
+    if not filename.lower().endswith('.apk'):
+        raise UploadError('File must be an APK file (.apk extension)')
+    
+    apk_path = Path(temp_dir) / filename
+    os.replace(file.stream.name, apk_path)
+    return apk_path
+
 @apk_analyzer_bp.route('/upload', methods=['POST'])
 def upload_apk():
     """
@@ -14,35 +57,70 @@ def upload_apk():
     Expects a multipart form with a file field named 'apk_file'.
     Returns JSON with analysis results or error details.
     """
-    if 'apk_file' not in request.files:
-        return jsonify({'error': 'No APK file provided'}), 400
-    
-    file = request.files['apk_file']
-    
-    # Validate file extension
-    if not file.filename.lower().endswith('.apk'):
-        return jsonify({'error': 'File must be an APK file (.apk extension)'}), 400
-    
     # Create temporary directory to store the APK
     with tempfile.TemporaryDirectory() as temp_dir:
         try:
-            # Save the uploaded file
-            apk_path = Path(temp_dir) / file.filename
-            file.save(str(apk_path))
+            # Stream the uploaded file to disk
+            try:
+                apk_path = _receive_apk(temp_dir)
+            except UploadError as ue:
+                return orjson_response({'error': str(ue)}, ue.status)
             
             # Run the analysis synchronously
             try:
                 results = asyncio.run(analyze_apk_file(str(apk_path)))
-                return jsonify(results), 200
+                return orjson_response(results, 200)
             except FileNotFoundError:
-                return jsonify({'error': f"APK file '{file.filename}' not found after saving"}), 400
+                return orjson_response({'error': f"APK file '{apk_path.name}' not found after saving"}, 400)
             except ValueError as ve:
-                return jsonify({'error': str(ve)}), 400
+                return orjson_response({'error': str(ve)}, 400)
             except Exception as e:
-                return jsonify({'error': f"Analysis failed: {str(e)}"}), 500
+                return orjson_response({'error': f"Analysis failed: {str(e)}"}, 500)
                 
         except Exception as e:
-            return jsonify({'error': f"Error processing file: {str(e)}"}), 500
+            return orjson_response({'error': f"Error processing file: {str(e)}"}, 500)
+
+def _stream_findings(apk_path: str, temp_dir: str):
+    """Drive iter_findings on a private event loop, yielding one NDJSON line per stage"""
+    loop = asyncio.new_event_loop()
+    findings = iter_findings(apk_path)
+    try:
+        while True:
+            try:
+                finding = loop.run_until_complete(findings.__anext__())
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                yield ndjson_line({'stage': 'error', 'result': {'error': f"Analysis failed: {str(e)}"}})
+                break
+            yield ndjson_line(finding)
+    finally:
+        # Also runs when the client disconnects mid-stream
+        loop.run_until_complete(findings.aclose())
+        loop.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+@apk_analyzer_bp.route('/upload/stream', methods=['POST'])
+def upload_apk_stream():
+    """
+    Same input as /upload, but streams each analysis stage back as NDJSON
+    while the scan runs. The final line carries the scan summary.
+    """
+    # The directory must outlive this view, so it is removed by the stream itself
+    temp_dir = tempfile.mkdtemp()
+    try:
+        apk_path = _receive_apk(temp_dir)
+    except UploadError as ue:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return orjson_response({'error': str(ue)}, ue.status)
+    except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return orjson_response({'error': f"Error processing file: {str(e)}"}, 500)
+    
+    return Response(
+        stream_with_context(_stream_findings(str(apk_path), temp_dir)),
+        mimetype='application/x-ndjson'
+    )
 
 @apk_analyzer_bp.route('/health', methods=['GET'])
 def health_check():
@@ -54,4 +132,4 @@ def health_check():
         'status': 'healthy',
         'groq_api_configured': groq_api_key is not None
     }
-    return jsonify(status), 200
\ No newline at end of file
+    return orjson_response(status, 200)
\ No newline at end of file
@@ -1,13 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 import sys
 import os
 import subprocess
 import json
 from pathlib import Path
-from scripts.scrape_cves import fetch_cve
+from scripts.scrape_cves import fetch_cve, get_cve_data_many
+from utils.orjson_response import orjson_response
 
 cve_bp = Blueprint('cve', __name__, url_prefix='/api/cve')
 
+# At NVD's unauthenticated 5 requests per 30s, uncached lookups beyond this would
+# hold a worker thread past the gunicorn timeout
+MAX_LOOKUP_MODULES = 50
+
 @cve_bp.route('/lookup', methods=['POST'])
 def cve_lookup():
     """API endpoint for CVE lookup"""
@@ -15,17 +20,23 @@ def cve_lookup():
         data = request.get_json()
         
         if not data or 'module_name' not in data:
-            return jsonify({'error': 'module_name is required'}), 400
+            return orjson_response({'error': 'module_name is required'}, 400)
         
         module_name = data['module_name'].strip()
         version = data.get('version', '').strip()
         
         if not module_name:
-            return jsonify({'error': 'module_name cannot be empty'}), 400
+            return orjson_response({'error': 'module_name cannot be empty'}, 400)
         
         # Use the imported function if available
         if fetch_cve:
             cves = fetch_cve(module_name)
+            if cves is None:
+                return orjson_response({
+                    'error': 'CVE lookup failed',
+                    'module_name': module_name,
+                    'cves': []
+                }, 502)
         else:
             # Fallback: call the script directly
             script_path = Path(__file__).parent.parent / 'scripts' / 'scrape_cves.py'
@@ -41,23 +52,23 @@ def cve_lookup():
                     # scrape_cves.py to output JSON format
                     cves = []
                 else:
-                    return jsonify({
+                    return orjson_response({
                         'error': 'Failed to execute CVE script',
                         'module_name': module_name,
                         'cves': []
-                    }), 500
+                    }, 500)
             except subprocess.TimeoutExpired:
-                return jsonify({
+                return orjson_response({
                     'error': 'CVE lookup timed out',
                     'module_name': module_name,
                     'cves': []
-                }), 500
+                }, 500)
             except Exception as e:
-                return jsonify({
+                return orjson_response({
                     'error': f'Script execution error: {str(e)}',
                     'module_name': module_name,
                     'cves': []
-                }), 500
+                }, 500)
         
         response_data = {
             'module_name': module_name,
@@ -66,12 +77,42 @@ def cve_lookup():
             'total_cves': len(cves) if cves else 0,
         }
         
-        return jsonify(response_data)
+        return orjson_response(response_data)
     
     except Exception as e:
         print(f"Unexpected error in CVE lookup: {e}")
-        return jsonify({
+        return orjson_response({
             'error': 'Internal server error',
             'module_name': data.get('module_name', '') if data else '',
             'cves': []
-        }), 500
\ No newline at end of file
+        }, 500)
+
+@cve_bp.route('/lookup-many', methods=['POST'])
+def cve_lookup_many():
+    """API endpoint for looking up CVEs for several modules in one request"""
+    data = request.get_json(silent=True) or {}
+    module_names = data.get('module_names')
+    
+    if not isinstance(module_names, list) or not module_names:
+        return orjson_response({'error': 'module_names must be a non-empty list'}, 400)
+    
+    module_names = [name.strip() for name in module_names if isinstance(name, str) and name.strip()]
+    if not module_names:
+        return orjson_response({'error': 'module_names cannot be empty'}, 400)
+    if len(module_names) > MAX_LOOKUP_MODULES:
+        return orjson_response({'error': f'At most {MAX_LOOKUP_MODULES} module_names per request'}, 400)
+    
+    try:
+        results = get_cve_data_many(module_names)
+    except Exception as e:
+        print(f"Unexpected error in CVE lookup: {e}")
+        return orjson_response({'error': 'Internal server error', 'results': {}}, 500)
+    
+    return orjson_response({
+        'results': {
+            name: {'cves': cves, 'total_cves': len(cves)}
+            for name, cves in results.items()
+        },
+        # Lookups that failed (e.g. NVD rate limiting) rather than came back clean
+        'failed': [name for name in dict.fromkeys(module_names) if name not in results]
+    })
@@ -1,16 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 import json
+from collections import deque
 from utils.network_scanner import (
     scan_target,
     get_open_ports,
     check_ssl_security,
     check_http_security,
+    check_security,
 )
 from utils.network_util import validate_target
+from utils.orjson_response import orjson_response
 
 network_scan_bp = Blueprint("network_scan", __name__, url_prefix="/api/network-scan")
 
-stored_results = []
+# Bounded so a long-running worker does not retain every scan forever.
+# Held per process: under gunicorn with several workers, /final_results and
+# /clear_results only see the results stored by the worker that serves them.
+MAX_STORED_RESULTS = 128
+stored_results = deque(maxlen=MAX_STORED_RESULTS)
 
 def add_result(route_name, data):
     stored_results.append({
@@ -26,13 +33,13 @@ def route_scan_target():
     chunk_size = data.get("chunk_size", 2000)
 
     if not target:
-        return jsonify({"error": "Missing target IP or hostname"}), 400
+        return orjson_response({"error": "Missing target IP or hostname"}, 400)
 
     results = scan_target(target, ports, chunk_size)
     add_result("scan_target", results)  # store result
 
     status_code = 200 if "error" not in results else 500
-    return jsonify(results), status_code
+    return orjson_response(results, status_code)
 
 
 @network_scan_bp.route("/get_open_ports", methods=["POST"])
@@ -42,13 +49,13 @@ def route_get_open_ports():
     scan_result = data.get("scan_result")
     
     if not target or not scan_result or not isinstance(scan_result, dict):
-        return jsonify({"error": "Missing target or invalid scan_result JSON"}), 400
+        return orjson_response({"error": "Missing target or invalid scan_result JSON"}, 400)
 
     # Fix: Pass both target and scan_result parameters
     open_ports = get_open_ports(target, scan_result)
     add_result("get_open_ports", open_ports)  # store result
 
-    return jsonify(open_ports), 200
+    return orjson_response(open_ports, 200)
 
 
 @network_scan_bp.route("/check_ssl_security", methods=["POST"])
@@ -58,13 +65,13 @@ def route_check_ssl_security():
     open_ports = data.get("open_ports")
 
     if not target or not open_ports:
-        return jsonify({"error": "Missing target or open_ports"}), 400
+        return orjson_response({"error": "Missing target or open_ports"}, 400)
 
     results = check_ssl_security(target, open_ports)
     add_result("check_ssl_security", results)  # store result
 
     status_code = 200 if "error" not in results else 500
-    return jsonify(results), status_code
+    return orjson_response(results, status_code)
 
 
 @network_scan_bp.route("/check_http_security", methods=["POST"])
@@ -74,26 +81,26 @@ def route_check_http_security():
     open_ports = data.get("open_ports")
 
     if not target or not open_ports:
-        return jsonify({"error": "Missing target or open_ports"}), 400
+        return orjson_response({"error": "Missing target or open_ports"}, 400)
 
     results = check_http_security(target, open_ports)
     add_result("check_http_security", results)  # store result
 
     status_code = 200 if "error" not in results else 500
-    return jsonify(results), status_code
+    return orjson_response(results, status_code)
 
 
 @network_scan_bp.route("/final_results", methods=["GET"])
 def get_final_results():
     """Return all stored results from previous calls."""
-    return jsonify(stored_results), 200
+    return orjson_response(list(stored_results), 200)
 
 
 @network_scan_bp.route("/clear_results", methods=["POST"])
 def clear_results():
     """Clear all stored results."""
     stored_results.clear()
-    return jsonify({"message": "Stored results cleared"}), 200
+    return orjson_response({"message": "Stored results cleared"}, 200)
 
 
 @network_scan_bp.route("/full_scan", methods=["POST"])
@@ -105,9 +112,10 @@ def full_scan():
     target = data.get("target")
     ports = data.get("ports", "1-65535")
     chunk_size = data.get("chunk_size", 2000)
+    security_checks = data.get("security_checks", False)
 
     if not target:
-        return jsonify({"error": "Missing target IP or hostname"}), 400
+        return orjson_response({"error": "Missing target IP or hostname"}, 400)
 
     final_result = {
         "target": target,
@@ -124,25 +132,25 @@ def full_scan():
     final_result["port_scan"] = port_scan_results
     if "error" in port_scan_results:
         final_result["errors"].append(f"Port Scan Error: {port_scan_results['error']}")
-        return jsonify(final_result), 500
+        return orjson_response(final_result, 500)
 
     print(target)
     # Step 2: Get Open Ports - Fixed: consistent parameter passing
     open_ports = get_open_ports(target, port_scan_results)
     final_result["open_ports"] = open_ports
 
-    # # Step 3: SSL Security Scan
-    # ssl_results = check_ssl_security(target, open_ports)
-    # final_result["ssl_security_findings"] = ssl_results
-    # if "error" in ssl_results:
-    #     final_result["errors"].append(f"SSL Scan Error: {ssl_results['error']}")
+    # Steps 3 & 4: SSL and HTTP checks are independent and I/O bound, so run them side by side
+    if security_checks and open_ports:
+        ssl_results, http_results = check_security(target, open_ports)
 
-    # # Step 4: HTTP Security Scan
-    # http_results = check_http_security(target, open_ports)
-    # final_result["http_security_findings"] = http_results
-    # if "error" in http_results:
-    #     final_result["errors"].append(f"HTTP Scan Error: {http_results['error']}")
+        final_result["ssl_security_findings"] = ssl_results
+        if "error" in ssl_results:
+            final_result["errors"].append(f"SSL Scan Error: {ssl_results['error']}")
+
+        final_result["http_security_findings"] = http_results
+        if "error" in http_results:
+            final_result["errors"].append(f"HTTP Scan Error: {http_results['error']}")
 
     status_code = 200 if not final_result["errors"] else 207  # 207 = Multi-Status
 
-    return jsonify(final_result), status_code
\ No newline at end of file
+    return orjson_response(final_result, status_code)
\ No newline at end of file
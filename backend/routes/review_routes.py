@@ -1,71 +1,211 @@
-from flask import Blueprint, request, jsonify
-from ai.prompts.prompts import (
-    general_review_prompt, security_audit_prompt, performance_optimization_prompt,
-    style_readability_prompt, bug_finding_prompt, documentation_prompt,
-    config_file_prompt, code_security_and_performance_prompt, upgrade_recommendations_prompt,
-    test_coverage_suggestions_prompt, refactor_prompt, concurrency_issues_prompt
-)
-from ai.inference import prompt_ai
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+import time
+from collections import OrderedDict
+from flask import Blueprint, Response, request, jsonify, abort, stream_with_context
+from ai.prompts.prompts import PROMPTS
+from ai.inference import prompt_ai, stream_ai, is_error
+from ai.llm_cache import cache_get, cache_set
 
 review_bp = Blueprint("review", __name__, url_prefix="/api/review")
 
+REVIEW_MODEL = "gemini-2.0-flash"
+REVIEW_TEMPERATURE = 0.7
+# In-process LRU in front of the on-disk LLM cache; repeat reviews never leave memory
+REVIEW_CACHE_SIZE = 1024
+REVIEW_CACHE_TTL = 24 * 3600
+# enabled | readonly (no writes) | writeonly (no lookups) | replay (lookups only, 409 on miss) | disabled
+REVIEW_CACHE_MODE = os.getenv("REVIEW_CACHE_MODE", "enabled").lower()
+_CACHE_READ = REVIEW_CACHE_MODE in ("enabled", "readonly", "replay")
+_CACHE_WRITE = REVIEW_CACHE_MODE in ("enabled", "writeonly")
+# Model calls in flight per process; extra requests wait here instead of tripping rate limits
+REVIEW_CONCURRENCY = 8
+
+_model_slots = threading.BoundedSemaphore(REVIEW_CONCURRENCY)
+
+_review_cache = OrderedDict()
+_review_cache_lock = threading.Lock()
+
+class ReplayMiss(Exception):
+    pass
+
+_TRAILING_WS_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+def _normalize_source(source_code: str) -> str:
+    # Resubmissions that differ only in encoding form, line endings or whitespace share a cache entry
+    text = unicodedata.normalize("NFC", source_code).replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_WS_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+def _review_key(prompt_func, prompt: str) -> str:
+    # Only output-affecting parameters go into the key
+    payload = "|".join((prompt_func.__name__, REVIEW_MODEL, str(REVIEW_TEMPERATURE), prompt))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _remember(key: str, result: str):
+    with _review_cache_lock:
+        _review_cache[key] = (time.monotonic(), result)
+        _review_cache.move_to_end(key)
+        while len(_review_cache) > REVIEW_CACHE_SIZE:
+            _review_cache.popitem(last=False)
+
+def _cache_lookup(key: str):
+    if not _CACHE_READ:
+        return None
+    with _review_cache_lock:
+        entry = _review_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < REVIEW_CACHE_TTL:
+            _review_cache.move_to_end(key)
+            return entry[1]
+    # Survives restarts, which is what makes replay useful while editing prompts
+    result = cache_get(key)
+    if result is not None:
+        _remember(key, result)
+    return result
+
+def _cache_store(key: str, result: str):
+    if not _CACHE_WRITE:
+        return
+    _remember(key, result)
+    cache_set(key, result)
+
+def _call_model(prompt: str) -> str:
+    if REVIEW_CACHE_MODE == "replay":
+        raise ReplayMiss()
+    with _model_slots:
+        return prompt_ai(prompt=prompt, model_name=REVIEW_MODEL, temperature=REVIEW_TEMPERATURE, cache=False)
+
+def _cached_review(prompt_func, prompt: str, key_prompt: str) -> str:
+    key = _review_key(prompt_func, key_prompt)
+    cached = _cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    result = _call_model(prompt)
+    if not is_error(result):
+        _cache_store(key, result)
+    return result
+
+def multi_review_prompt(filename: str, source_code: str, aspects: list) -> str:
+    # Each aspect's instruction is its usual prompt rendered without the source, which is sent once
+    instructions = "".join(f'- "{aspect}": {PROMPTS[aspect](filename, "").strip()}\n' for aspect in aspects)
+    return "".join((
+        "Carry out each of the following reviews of the file '", filename, "':\n",
+        instructions,
+        "\nReturn ONLY a JSON object whose keys are the review names above and whose values "
+        "are the corresponding review as a Markdown string.\n\n",
+        source_code,
+    ))
+
+def _parse_multi_review(response: str) -> dict:
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(response[start:end + 1])
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
 def run_review(prompt_func):
     data = request.get_json()
     source_code = data.get("source_code", "")
     filename = data.get("filename", "")
     prompt = prompt_func(filename, source_code)
-    result = prompt_ai(prompt=prompt)
+    key_prompt = prompt_func(filename, _normalize_source(source_code))
+    result = _cached_review(prompt_func, prompt, key_prompt)
     return jsonify({"result": result})
 
-@review_bp.route("/general", methods=["POST"])
-def review_general():
-    return run_review(general_review_prompt)
+@review_bp.errorhandler(ReplayMiss)
+def replay_miss(e):
+    return jsonify({"error": "No cached review for this request (REVIEW_CACHE_MODE=replay)"}), 409
+
+@review_bp.route("/multi", methods=["POST"])
+def review_multi():
+    """Run several review kinds for one file with a single model call."""
+    data = request.get_json()
+    source_code = data.get("source_code", "")
+    filename = data.get("filename", "")
+    aspects = list(dict.fromkeys(data.get("aspects") or []))
+
+    unknown = [aspect for aspect in aspects if aspect not in PROMPTS]
+    if not aspects or unknown:
+        return jsonify({"error": f"aspects must be a non-empty list drawn from: {', '.join(PROMPTS)}"}), 400
+
+    normalized = _normalize_source(source_code)
+    keys = {aspect: _review_key(PROMPTS[aspect], PROMPTS[aspect](filename, normalized)) for aspect in aspects}
+    results = {aspect: _cache_lookup(key) for aspect, key in keys.items()}
+    pending = [aspect for aspect in aspects if results[aspect] is None]
 
-@review_bp.route("/security", methods=["POST"])
-def review_security():
-    return run_review(security_audit_prompt)
+    if len(pending) > 1:
+        response = _call_model(multi_review_prompt(filename, source_code, pending))
+        parsed = {} if is_error(response) else _parse_multi_review(response)
+        for aspect in pending:
+            review = parsed.get(aspect)
+            if isinstance(review, str) and review.strip():
+                results[aspect] = review.strip()
+                _cache_store(keys[aspect], results[aspect])
 
-@review_bp.route("/performance", methods=["POST"])
-def review_performance():
-    return run_review(performance_optimization_prompt)
+    # Anything the combined answer left out falls back to its own request
+    for aspect in aspects:
+        if results[aspect] is None:
+            prompt_func = PROMPTS[aspect]
+            results[aspect] = _cached_review(prompt_func, prompt_func(filename, source_code), prompt_func(filename, normalized))
 
-@review_bp.route("/style", methods=["POST"])
-def review_style():
-    return run_review(style_readability_prompt)
+    return jsonify({"results": results})
 
-@review_bp.route("/bugs", methods=["POST"])
-def review_bugs():
-    return run_review(bug_finding_prompt)
+@review_bp.route("/<kind>", methods=["POST"])
+def review_kind(kind):
+    prompt_func = PROMPTS.get(kind)
+    if prompt_func is None:
+        abort(404)
+    return run_review(prompt_func)
 
-@review_bp.route("/docs", methods=["POST"])
-def review_docs():
-    return run_review(documentation_prompt)
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@review_bp.route("/<kind>/stream", methods=["POST"])
+def review_kind_stream(kind):
+    """Same input as /<kind>, answered as Server-Sent Events while the model generates."""
+    prompt_func = PROMPTS.get(kind)
+    if prompt_func is None:
+        abort(404)
 
-@review_bp.route("/config", methods=["POST"])
-def review_config():
     data = request.get_json()
     source_code = data.get("source_code", "")
     filename = data.get("filename", "")
-    prompt = config_file_prompt(filename, source_code)
-    result = prompt_ai(prompt=prompt)
-    return jsonify({"result": result})
+    prompt = prompt_func(filename, source_code)
+    key = _review_key(prompt_func, prompt_func(filename, _normalize_source(source_code)))
 
-@review_bp.route("/security-performance", methods=["POST"])
-def review_sec_perf():
-    return run_review(code_security_and_performance_prompt)
+    cached = _cache_lookup(key)
+    if cached is None and REVIEW_CACHE_MODE == "replay":
+        raise ReplayMiss()
 
-@review_bp.route("/upgrade", methods=["POST"])
-def review_upgrade():
-    return run_review(upgrade_recommendations_prompt)
+    def generate():
+        if cached is not None:
+            yield _sse("message", {"text": cached})
+            yield _sse("done", {"cached": True})
+            return
 
-@review_bp.route("/tests", methods=["POST"])
-def review_tests():
-    return run_review(test_coverage_suggestions_prompt)
+        parts = []
+        with _model_slots:
+            for text in stream_ai(prompt=prompt, model_name=REVIEW_MODEL, temperature=REVIEW_TEMPERATURE, cache=False):
+                if is_error(text):
+                    yield _sse("error", {"error": text})
+                    return
+                parts.append(text)
+                yield _sse("message", {"text": text})
 
-@review_bp.route("/refactor", methods=["POST"])
-def review_refactor():
-    return run_review(refactor_prompt)
+        _cache_store(key, "".join(parts).strip())
+        yield _sse("done", {"cached": False})
 
-@review_bp.route("/concurrency", methods=["POST"])
-def review_concurrency():
-    return run_review(concurrency_issues_prompt)
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,53 +4,101 @@ import subprocess
 import os
 import json
 import datetime
+import hashlib
+import io
+import importlib.metadata
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from werkzeug.utils import secure_filename
-from blockchain.slither_analyser import analyze_and_patch
+from blockchain.slither_analyser import analyze_and_patch, PATCH_UNAVAILABLE
 
 solidity_bp = Blueprint('solidity', __name__, url_prefix='/api/solidity')
 
 ALLOWED_EXTENSIONS = {'sol'}
-UPLOAD_FOLDER = 'uploads/solidity'
+# Contracts only live for the length of one analysis, so keep them on tmpfs when available
+CONTRACT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
 MAX_FILE_SIZE = 16 * 1024 * 1024
+COPY_CHUNK = 1 << 20
+# Identical contracts (e.g. CI loops) reuse the previous analysis
+ANALYSIS_CACHE_SIZE = 256
+ANALYSIS_CACHE_TTL = 24 * 3600
+
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
 
 def allowed_file(filename):
   return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def ensure_upload_folder():
-  if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 def get_current_timestamp():
   return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+class FileTooLarge(Exception):
+  pass
+
+def _write_contract(stream, fd):
+  # Single pass over the upload: hash, size-check and write each chunk
+  digest = hashlib.sha256()
+  size = 0
+  with os.fdopen(fd, 'wb') as f:
+    while True:
+      chunk = stream.read(COPY_CHUNK)
+      if not chunk:
+        break
+      size += len(chunk)
+      if size > MAX_FILE_SIZE:
+        raise FileTooLarge()
+      digest.update(chunk)
+      f.write(chunk)
+  return digest.hexdigest()
+
+def analyze_cached(stream, filename):
+  """Run analyze_and_patch on the contract unless an identical one was analyzed recently."""
+  # mkstemp's random component keeps names unique; Slither and solc need a real path ending in .sol
+  fd, filepath = tempfile.mkstemp(prefix="contract_", suffix=f"_{filename}", dir=CONTRACT_DIR)
+  try:
+    key = _write_contract(stream, fd)
+
+    if request.args.get('no_cache') != '1':
+      with _analysis_cache_lock:
+        entry = _analysis_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ANALYSIS_CACHE_TTL:
+          _analysis_cache.move_to_end(key)
+          # Same findings, but report this upload's path and time rather than the original's
+          return dict(entry[1], file=filepath, timestamp=get_current_timestamp())
+
+    results = analyze_and_patch(filepath)
+  finally:
+    try: os.remove(filepath)
+    except: pass
+
+  # A Gemini outage leaves findings without patches; those results are not worth keeping
+  patched = all(v.get("patch") != PATCH_UNAVAILABLE for v in results.get("vulnerabilities", []))
+  if "error" not in results and patched:
+    with _analysis_cache_lock:
+      _analysis_cache[key] = (time.monotonic(), results)
+      _analysis_cache.move_to_end(key)
+      while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+  return results
+
 @solidity_bp.route('/analyze', methods=['POST'])
 def analyze_contract():
-  try:
-    ensure_upload_folder()
+  # Reject on the declared size before any of the body is read
+  if request.content_length and request.content_length > MAX_FILE_SIZE:
+    return jsonify({"error": "File too large. Max 16MB"}), 413
 
+  try:
     if 'file' in request.files:
       file = request.files['file']
       if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
       if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-
-        if file_size > MAX_FILE_SIZE:
-          return jsonify({"error": "File too large. Max 16MB"}), 400
-
-        file.save(filepath)
-        results = analyze_and_patch(filepath)
-
-        try: os.remove(filepath)
-        except: pass
-
+        results = analyze_cached(file.stream, filename)
         return jsonify(results)
       else:
         return jsonify({"error": "Invalid file type. Only .sol allowed"}), 400
@@ -65,39 +113,44 @@ def analyze_contract():
       if not contract_name.endswith('.sol'):
         contract_name += '.sol'
 
-      timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-      filename = f"{timestamp}_{secure_filename(contract_name)}"
-      filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-      with open(filepath, 'w') as f:
-        f.write(contract_code)
-
-      results = analyze_and_patch(filepath)
-
-      try: os.remove(filepath)
-      except: pass
-
+      results = analyze_cached(io.BytesIO(contract_code.encode()), secure_filename(contract_name))
       return jsonify(results)
     else:
       return jsonify({"error": "No contract file or code provided"}), 400
 
+  except FileTooLarge:
+    return jsonify({"error": "File too large. Max 16MB"}), 400
   except Exception as e:
     traceback.print_exc()
     return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@lru_cache(maxsize=1)
+def slither_version():
+  # Cached per process; failures raise and are therefore retried on the next call
+  if shutil.which("slither") is None:
+    raise FileNotFoundError("slither")
+  try:
+    return importlib.metadata.version("slither-analyzer")
+  except importlib.metadata.PackageNotFoundError:
+    pass
+  # The CLI lives in another environment (e.g. pipx), so ask it directly
+  result = subprocess.run(
+    ["slither", "--version"],
+    stdout=subprocess.PIPE,
+    stderr=subprocess.PIPE,
+    text=True,
+    timeout=10
+  )
+  return result.stdout.strip() if result.returncode == 0 else "Unknown"
+
 @solidity_bp.route('/check-slither', methods=['GET'])
 def check_slither():
+  if request.args.get('refresh') == '1':
+    slither_version.cache_clear()
   try:
-    result = subprocess.run(
-      ["slither", "--version"],
-      stdout=subprocess.PIPE,
-      stderr=subprocess.PIPE,
-      text=True,
-      timeout=10
-    )
     return jsonify({
       "installed": True,
-      "version": result.stdout.strip() if result.returncode == 0 else "Unknown",
+      "version": slither_version(),
       "status": "available"
     })
   except subprocess.TimeoutExpired:
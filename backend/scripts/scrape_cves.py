@@ -1,25 +1,104 @@
 import json
 import os
+import random
+import sqlite3
+import threading
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+try:
+    from ai.ratelimit import TokenBucket
+except ImportError:
+    # Run as a standalone script from backend/scripts, where backend/ is not on sys.path
+    import sys
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from ai.ratelimit import TokenBucket
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 NVD_API_URL = "https://services.nvd.nist.gov/rest/json/cves/2.0"
-CACHE_FILE = Path("../data/cve.json")
-print(CACHE_FILE)
+CACHE_DB = Path("../data/cve.db")
+# Pre-SQLite cache; imported once when the database is first created
+LEGACY_CACHE_FILE = Path("../data/cve.json")
+print(CACHE_DB)
 CACHE_EXPIRY_DAYS = 7
+FETCH_WORKERS = 8
+MAX_FETCH_ATTEMPTS = 4
+NVD_API_KEY = os.getenv("NVD_API_KEY")
+
+# NVD allows 5 requests per rolling 30s window, or 50 with an API key; the quota is
+# shared by every server worker process
+_workers = max(1, int(os.getenv("WORKERS", "1")))
+_nvd_rpm, _nvd_burst = (100, 50) if NVD_API_KEY else (10, 5)
+_nvd_bucket = TokenBucket(rpm=_nvd_rpm / _workers, tpm=0, burst=max(1, _nvd_burst / _workers))
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
+if NVD_API_KEY:
+    _session.headers["apiKey"] = NVD_API_KEY
+
+_conn = None
+_lock = threading.Lock()
+
+def _dumps(value):
+    return orjson.dumps(value) if orjson is not None else json.dumps(value).encode()
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _import_legacy_cache(conn):
+    if not LEGACY_CACHE_FILE.exists():
+        return
+    try:
+        legacy = _loads(LEGACY_CACHE_FILE.read_bytes())
+        rows = [
+            (module, _dumps(entry['cves']), datetime.fromisoformat(entry['timestamp']).timestamp())
+            for module, entry in legacy.items()
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Skipping legacy CVE cache: {e}")
+        return
+    conn.executemany("INSERT OR IGNORE INTO cve (module, cves, ts) VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+def _connection():
+    global _conn
+    if _conn is None:
+        CACHE_DB.parent.mkdir(exist_ok=True)
+        is_new = not CACHE_DB.exists()
+        _conn = sqlite3.connect(str(CACHE_DB), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS cve (module TEXT PRIMARY KEY, cves BLOB, ts REAL)")
+        if is_new:
+            _import_legacy_cache(_conn)
+    return _conn
+
+def load_cache(module_name):
+    """Return the cached entry for one module as {'cves', 'timestamp'}, or None."""
+    with _lock:
+        row = _connection().execute("SELECT cves, ts FROM cve WHERE module=?", (module_name,)).fetchone()
+    if row is None:
+        return None
+    return {'cves': _loads(row[0]), 'timestamp': datetime.fromtimestamp(row[1]).isoformat()}
 
-def load_cache():
-    if CACHE_FILE.exists():
-        with open(CACHE_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+def save_cache(module_name, cves):
+    save_cache_many({module_name: cves})
 
-def save_cache(cache):
-    CACHE_FILE.parent.mkdir(exist_ok=True)
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(cache, f, indent=2)
+def save_cache_many(results):
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO cve (module, cves, ts) VALUES (?, ?, ?)",
+            [(module_name, _dumps(cves), now) for module_name, cves in results.items()]
+        )
+        conn.commit()
 
 def is_cache_valid(cache_entry):
     if not cache_entry or 'timestamp' not in cache_entry:
@@ -28,14 +107,17 @@ def is_cache_valid(cache_entry):
     return (datetime.now() - cache_time).days < CACHE_EXPIRY_DAYS
 
 def fetch_cve(module_name):
+    """CVEs for one module from NVD, or None when the lookup failed (as opposed to found nothing)."""
     try:
         params = {"keywordSearch": module_name}
-        response = requests.get(NVD_API_URL, params=params, timeout=10)
-        
-        if response.status_code == 403:
-            print("Rate limit exceeded. Waiting 30 seconds...")
-            time.sleep(30)
-            response = requests.get(NVD_API_URL, params=params, timeout=10)
+        for attempt in range(MAX_FETCH_ATTEMPTS):
+            _nvd_bucket.acquire()
+            response = _session.get(NVD_API_URL, params=params, timeout=10)
+            if response.status_code != 403 or attempt == MAX_FETCH_ATTEMPTS - 1:
+                break
+            delay = random.uniform(0, min(30, 2 * 2 ** attempt))
+            print(f"Rate limit exceeded. Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
         
         response.raise_for_status()
         data = response.json()
@@ -56,26 +138,50 @@ def fetch_cve(module_name):
     
     except requests.RequestException as e:
         print(f"Error fetching CVE for {module_name}: {e}")
-        return []
+        return None
 
 def get_cve_data(module_name):
-    cache = load_cache()
+    entry = load_cache(module_name)
     
-    if module_name in cache and is_cache_valid(cache[module_name]):
+    if is_cache_valid(entry):
         print(f"Using cached CVE data for {module_name}")
-        return cache[module_name]['cves']
+        return entry['cves']
     
     print(f"Fetching CVE data for {module_name} from NVD API")
     cves = fetch_cve(module_name)
-    
-    cache[module_name] = {
-        'cves': cves,
-        'timestamp': datetime.now().isoformat()
-    }
-    save_cache(cache)
+    # Failures are not cached, so a rate-limit burst is not remembered as "no CVEs"
+    if cves is not None:
+        save_cache(module_name, cves)
     
     return cves
 
+def get_cve_data_many(module_names):
+    """Look up several modules at once; cache misses are fetched concurrently and stored together.
+
+    Modules whose fetch failed are left out of the result.
+    """
+    results = {}
+    misses = []
+    for module_name in dict.fromkeys(module_names):
+        entry = load_cache(module_name)
+        if is_cache_valid(entry):
+            results[module_name] = entry['cves']
+        else:
+            misses.append(module_name)
+    
+    if misses:
+        print(f"Fetching CVE data for {len(misses)} modules from NVD API")
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(misses))) as executor:
+            fetched = {
+                module_name: cves
+                for module_name, cves in zip(misses, executor.map(fetch_cve, misses))
+                if cves is not None
+            }
+        save_cache_many(fetched)
+        results.update(fetched)
+    
+    return results
+
 def main():
     module_name = input("Enter module or program name to fetch CVEs for: ").strip()
     if not module_name:
@@ -84,7 +190,9 @@ def main():
     
     cves = get_cve_data(module_name)
     
-    if cves:
+    if cves is None:
+        print(f"CVE lookup for {module_name} failed.")
+    elif cves:
         print(f"\nFound {len(cves)} CVEs for {module_name}:")
         for cve in cves:
             print(f"\nCVE ID: {cve['id']}")
@@ -1,26 +1,83 @@
 import os
-import openai
+import asyncio
+import atexit
+import importlib.util
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from ai.ratelimit import TokenBucket, estimate_tokens
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+MODEL_NAME = "gpt-4"
+MAX_TOKENS = 500
+TEMPERATURE = 0.1
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+_bucket = TokenBucket.from_env("OPENAI", rpm=500, tpm=10_000)
+
+_client = None
+_async_client = None
+
+def get_client() -> OpenAI:
+    """Process-wide OpenAI client; do not build one per request, it would redo TCP+TLS every call."""
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.Client(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+        )
+        atexit.register(_client.close)
+    return _client
+
+def get_async_client() -> AsyncOpenAI:
+    # Bound to the event loop that first uses it; keep all async calls on one loop
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.AsyncClient(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+        )
+    return _async_client
+
+def _messages(prompt):
+    return [
+        {"role": "user", "content": prompt}
+    ]
 
 def chat_with_gpt(prompt):
-    response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
+    _bucket.acquire(estimate_tokens(prompt) + MAX_TOKENS)
+    response = get_client().chat.completions.create(
+        model=MODEL_NAME,
+        messages=_messages(prompt),
+        max_tokens=MAX_TOKENS,
         n=1,
         stop=None,
-        temperature=0.1,
+        temperature=TEMPERATURE,
     )
     return response.choices[0].message.content.strip()
 
-if __name__ == "__main__":
+async def chat_with_gpt_async(prompt):
+    await _bucket.acquire_async(estimate_tokens(prompt) + MAX_TOKENS)
+    stream = await get_async_client().chat.completions.create(
+        model=MODEL_NAME,
+        messages=_messages(prompt),
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE,
+        stream=True,
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts).strip()
+
+async def main():
     while True:
-        user_input = input("You: ")
+        user_input = await asyncio.to_thread(input, "You: ")
         if user_input.lower() in ("exit", "quit"):
             print("Bye!")
             break
-        answer = chat_with_gpt(user_input)
+        answer = await chat_with_gpt_async(user_input)
         print("ChatGPT:", answer)
+
+if __name__ == "__main__":
+    asyncio.run(main())
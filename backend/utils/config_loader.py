@@ -1,18 +1,48 @@
 from pathlib import Path
+from functools import lru_cache
+import ipaddress
 import json
 import platform
 from prompt_toolkit import PromptSession
 from prompt_toolkit.validation import Validator, ValidationError
 from prompt_toolkit.document import Document
-import re
+import idna
 
 CONFIG_FILE = Path("../data/config.json")
+LOCAL_TARGETS = frozenset(("current", "localhost"))
 
+def is_valid_target(target):
+    # ipaddress and idna do the label/octet checks without a backtracking regex
+    if target in LOCAL_TARGETS:
+        return True
+    try:
+        ipaddress.ip_address(target)
+        return True
+    except ValueError:
+        pass
+    try:
+        idna.encode(target)
+        return True
+    except idna.IDNAError:
+        return False
+
+def _os_release_ids():
+    try:
+        text = Path("/etc/os-release").read_text()
+    except OSError:
+        return set()
+    ids = set()
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        if key in ("ID", "ID_LIKE"):
+            ids.update(value.strip().strip('"\'').lower().split())
+    return ids
+
+@lru_cache(maxsize=1)
 def get_default_source_path():
-    if platform.system() == "Linux" and Path("/etc/os-release").exists():
-        with open("/etc/os-release", "r") as f:
-            if "arch" in f.read().lower():
-                return "/srv/http"
+    # Arch and its derivatives (ID or ID_LIKE "arch") serve from /srv/http
+    if platform.system() == "Linux" and "arch" in _os_release_ids():
+        return "/srv/http"
     return "/var/www/html"
 
 def save_config(config):
@@ -86,11 +116,7 @@ class TargetValidator(Validator):
         text = document.text.lower()
         if not text:
             raise ValidationError(message="Target cannot be empty")
-        if text in ("current", "localhost"):
-            return
-        ip_pattern = r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-        hostname_pattern = r"^[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$"
-        if re.match(ip_pattern, text) or re.match(hostname_pattern, text):
+        if is_valid_target(text):
             return
         raise ValidationError(message="Invalid IP, hostname, or 'current'")
 
@@ -123,9 +149,7 @@ class YesNoValidator(Validator):
 def validate_args(args):
     if args.target:
         target = args.target.lower()
-        ip_pattern = r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-        hostname_pattern = r"^[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$"
-        if not (target in ("current", "localhost") or re.match(ip_pattern, target) or re.match(hostname_pattern, target)):
+        if not is_valid_target(target):
             raise ValueError(f"Invalid target: {args.target}")
 
     if args.ports:
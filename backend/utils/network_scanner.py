@@ -1,274 +1,560 @@
-import nmap
-import os
-import re
+import asyncio
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from uuid import uuid4
-from utils.network_util import validate_target, save_json
-
-def scan_chunk(target: str, ports_chunk: str, return_dict: dict, lock: threading.Lock):
-    """Scan a chunk of ports and store results in return_dict."""
+import time
+import json
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from utils.network_util import _lookup, _resolve, save_json, NDJSONSink, disk_cached, disable_scan_cache
+
+# Phase 1 only asks which ports are open; -sV/-O then run once, on just those ports.
+# Scan type is left to nmap (SYN when privileged, connect otherwise), as before.
+# Probe parallelism is set here rather than by splitting the range across threads:
+# one nmap process schedules probes far better than many competing ones.
+# Targets are resolved once in Python and handed to nmap as an address, hence -n throughout.
+DISCOVERY_ARGS = "-T4 --min-rate 5000 --max-retries 2 --min-parallelism 50 --max-parallelism 150 -Pn -n"
+SERVICE_ARGS = "-sV -O -Pn -T4 -n"
+SSL_SCRIPT_ARGS = "-sV --script ssl-enum-ciphers,ssl-cert,ssl-known-key,ssl-date,ssl-dh-params,ssl-heartbleed"
+HTTP_SCRIPT_ARGS = "-sV --script http-headers,http-methods,http-security-headers,http-vuln-cve2017-5638,http-slowloris-check"
+
+# nmap is given the address, so the hostname is passed on for SNI and the Host header
+_VHOST_SCRIPT_ARGS = {"ssl": "tls.servername", "http": "http.host"}
+
+# Upper bound on nmap processes one async check batch keeps in flight
+NMAP_CONCURRENCY = 16
+
+# Substrings searched for in NSE output
+WEAK_CIPHERS = ("RC4", "MD5", "DES", "3DES")
+OUTDATED_TLS = ("TLSv1.0", "TLSv1.1", "SSLv2", "SSLv3")
+REQUIRED_HEADERS = (
+    "Content-Security-Policy",
+    "Strict-Transport-Security",
+    "X-Frame-Options",
+    "X-Content-Type-Options"
+)
+UNSAFE_METHODS = ("TRACE", "DELETE", "PUT")
+
+def _build_ssl_detector():
+    """Compile the cipher/TLS checks into one straight-line function with the patterns baked in."""
+    rules = [
+        (cipher, f"Weak cipher detected: {cipher}", f"Disable weak cipher {cipher} in server configuration.")
+        for cipher in WEAK_CIPHERS
+    ] + [
+        (version, f"Outdated TLS version: {version}", f"Disable {version} and enable TLSv1.2 or TLSv1.3.")
+        for version in OUTDATED_TLS
+    ]
+    lines = ["def _detect_ssl(blob, issues, remediations):"]
+    for needle, issue, remediation in rules:
+        lines.append(f"    if {needle!r} in blob:")
+        lines.append(f"        issues.append({issue!r})")
+        lines.append(f"        remediations.append({remediation!r})")
+    namespace = {}
+    exec(compile("\n".join(lines), "<ssl-detector>", "exec"), namespace)
+    return namespace["_detect_ssl"]
+
+_detect_ssl = _build_ssl_detector()
+
+_SSL_PORTS = frozenset((443, 8443))
+_HTTP_PORTS = frozenset((80, 443, 8080, 8443))
+_HTTP_SVCS = frozenset(("http", "https", "ssl"))
+
+# NSE output per (ip, hostname, port, kind); repeat checks of the same host share one scan
+SCRIPT_CACHE_TTL = 600
+_SCRIPT_CACHE = {}
+_script_cache_lock = threading.Lock()
+
+def clear_script_cache():
+    with _script_cache_lock:
+        _SCRIPT_CACHE.clear()
+
+async def _ports_scripts(target: str, ip: str, ports: list, kind: str, args: str, semaphore=None) -> dict:
+    """NSE script output per port; cache misses are scanned together in one nmap run."""
+    now = time.monotonic()
+    results = {}
+    with _script_cache_lock:
+        for port in ports:
+            entry = _SCRIPT_CACHE.get((ip, target, port, kind))
+            if entry is not None and now - entry[0] < SCRIPT_CACHE_TTL:
+                results[port] = entry[1]
+    misses = [port for port in ports if port not in results]
+    if not misses:
+        return results
+
+    # The hostname goes in as its own argv item, never through the shlex-split args string
+    extra = ("--script-args", f"{_VHOST_SCRIPT_ARGS[kind]}={target}") if target != ip else ()
+    tcp = await run_nmap_async(ip, ",".join(map(str, misses)), f"{args} -Pn -T4 -n", semaphore, extra)
+    now = time.monotonic()
+    with _script_cache_lock:
+        for port in misses:
+            # Ports nmap did not report stay absent so they are retried next time
+            if port in tcp:
+                results[port] = tcp[port].get('script', {})
+                _SCRIPT_CACHE[(ip, target, port, kind)] = (now, results[port])
+    return results
+
+def _port_record(elem: ET.Element) -> Tuple[int, str, dict]:
+    """Convert one <port> element into (port, state, info), info shaped like python-nmap's port dict."""
+    state_el = elem.find('state')
+    state = state_el.get('state', '') if state_el is not None else ''
+    service = elem.find('service')
+    service = service if service is not None else ET.Element('service')
+    info = {
+        'state': state,
+        'reason': state_el.get('reason', '') if state_el is not None else '',
+        'name': service.get('name', ''),
+        'product': service.get('product', ''),
+        'version': service.get('version', ''),
+        'extrainfo': service.get('extrainfo', ''),
+        'conf': service.get('conf', ''),
+        'cpe': ' '.join(cpe.text or '' for cpe in service.findall('cpe')),
+    }
+    scripts = {script.get('id'): script.get('output', '') for script in elem.findall('script')}
+    if scripts:
+        info['script'] = scripts
+    return int(elem.get('portid')), state, info
+
+def stream_nmap(target: str, ports: Optional[str], arguments: str) -> Iterator[Tuple[int, str, dict]]:
+    """Run nmap with XML on stdout and yield each TCP (port, state, info).
+
+    The XML is parsed incrementally so memory stays flat on full-range scans; nmap writes a
+    host's <ports> only once that host is finished, so results do not arrive early.
+    """
+    cmd = _nmap_cmd(target, ports, arguments)
+
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        parser = ET.XMLPullParser(events=("end",))
+        try:
+            while True:
+                data = proc.stdout.read1(1 << 16)
+                if not data:
+                    break
+                parser.feed(data)
+                for _, elem in parser.read_events():
+                    if elem.tag == 'port':
+                        if elem.get('protocol') == 'tcp':
+                            yield _port_record(elem)
+                        # Keep memory flat on full-range scans
+                        elem.clear()
+            if proc.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(stderr.read().decode(errors="replace").strip() or f"nmap exited with {proc.returncode}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+def run_nmap(target: str, ports: Optional[str], arguments: str) -> dict:
+    """TCP port results of one nmap run keyed by port number."""
+    return {port: info for port, _, info in stream_nmap(target, ports, arguments)}
+
+@lru_cache(maxsize=1)
+def _nmap_path() -> str:
+    # Looked up once per process rather than on every spawn; a miss is not cached
+    path = shutil.which("nmap")
+    if path is None:
+        raise RuntimeError("nmap executable not found in PATH")
+    return path
+
+def _nmap_cmd(target: str, ports: Optional[str], arguments: str, extra: tuple = ()) -> list:
+    cmd = [_nmap_path(), "-oX", "-", *shlex.split(arguments), *extra]
+    if ports:
+        cmd += ["-p", ports]
+    if ":" in target:
+        cmd.append("-6")
+    cmd.append(target)
+    return cmd
+
+async def run_nmap_async(target: str, ports: Optional[str], arguments: str, semaphore=None, extra: tuple = ()) -> dict:
+    """Like run_nmap, but awaits the nmap process so many runs can share one event loop."""
+    if semaphore is not None:
+        async with semaphore:
+            return await run_nmap_async(target, ports, arguments, extra=extra)
+
+    proc = await asyncio.create_subprocess_exec(
+        *_nmap_cmd(target, ports, arguments, extra), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
     try:
-        scanner = nmap.PortScanner()
-        # Use aggressive timing (-T4) and combine service detection with OS detection
-        scanner.scan(target, arguments=f"-p {ports_chunk} -sV -O -Pn -T4")
-        with lock:
-            if target in scanner.all_hosts():
-                tcp_results = scanner[target].get('tcp', {})
-                return_dict.update(tcp_results)
-    except Exception as e:
-        with lock:
-            return_dict['error'] = str(e)
+        stdout, stderr = await proc.communicate()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.decode(errors="replace").strip() or f"nmap exited with {proc.returncode}")
+
+    results = {}
+    for elem in ET.fromstring(stdout).iter('port'):
+        if elem.get('protocol') == 'tcp':
+            port, _, info = _port_record(elem)
+            results[port] = info
+    return results
 
 def scan_target(target: str, ports: str = "1-65535", chunk_size: int = 1000) -> dict:
-    """Scan target for open ports using threading for faster execution."""
-    if not validate_target(target):
+    """Scan target in two phases: fast open-port discovery, then service/OS detection on open ports."""
+    # chunk_size is kept for API compatibility; nmap parallelizes a single scan itself
+    ip = _resolve(target)
+    if ip is None:
         return {"error": "Invalid target hostname or IP"}
 
     print(f"[*] Scanning target {target} for ports {ports}...\n")
 
-    start_port, end_port = map(int, ports.split('-'))
-    return_dict = {}
-    lock = threading.Lock()
-    port_ranges = []
-
-    # Split ports into smaller chunks
-    for chunk_start in range(start_port, end_port + 1, chunk_size):
-        chunk_end = min(chunk_start + chunk_size - 1, end_port)
-        port_ranges.append(f"{chunk_start}-{chunk_end}")
-
-    # Use ThreadPoolExecutor for parallel scanning
-    with ThreadPoolExecutor(max_workers=os.cpu_count() * 4) as executor:
-        futures = [
-            executor.submit(scan_chunk, target, pr, return_dict, lock)
-            for pr in port_ranges
-        ]
-        # Wait for all threads to complete
-        for future in futures:
-            future.result()
+    try:
+        discovered = {}
+        open_ports = []
+        for port, state, info in stream_nmap(ip, ports, DISCOVERY_ARGS):
+            discovered[port] = info
+            if state == 'open':
+                open_ports.append(str(port))
+        if not open_ports:
+            return {'tcp': discovered}
+
+        return {'tcp': run_nmap(ip, ",".join(open_ports), SERVICE_ARGS)}
+    except Exception as e:
+        # Keep whatever discovery found alongside the failure instead of dropping it
+        if discovered:
+            return {'tcp': discovered, "error": str(e)}
+        return {"error": str(e)}
+
+class PortInfo(NamedTuple):
+    proto: str
+    port: int
+    service: str
+    product: str
+    version: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.proto}/{self.port}"
+
+def open_port_infos(port_scan_results: dict) -> list:
+    """Open ports from port scan results as PortInfo records."""
+    return [
+        PortInfo('tcp', int(port), info.get('name', 'unknown'), info.get('product', ''), info.get('version', ''))
+        for port, info in port_scan_results.get('tcp', {}).items()
+        if info.get('state') == 'open'
+    ]
+
+def _as_port_infos(open_ports) -> list:
+    # The routes hand over the JSON form keyed by "tcp/<port>"; parse each key once here
+    if not isinstance(open_ports, dict):
+        return open_ports
+    infos = []
+    for key, info in open_ports.items():
+        proto, port = key.split('/')
+        infos.append(PortInfo(proto, int(port), info.get("service", ""), info.get("product", ""), info.get("version", "")))
+    return infos
+
+def _ports_dict(port_infos: list) -> dict:
+    return {
+        p.key: {"service": p.service, "product": p.product, "version": p.version}
+        for p in port_infos
+    }
 
-    if 'error' in return_dict:
-        return {"error": return_dict['error']}
+def _is_ssl(port: int, service: str) -> bool:
+    return "ssl" in service or port in _SSL_PORTS
 
-    return {'tcp': return_dict}
+def _is_http(port: int, service: str) -> bool:
+    return service in _HTTP_SVCS or port in _HTTP_PORTS
 
 def get_open_ports(host: str, port_scan_results: dict) -> dict:
     """Parse open ports and services from port scan results."""
-    open_ports = {}
-    for port, info in port_scan_results.get('tcp', {}).items():
-        if info.get('state') == 'open':
-            open_ports[f"tcp/{port}"] = {
-                "service": info.get('name', 'unknown'),
-                "product": info.get('product', ''),
-                "version": info.get('version', '')
-            }
-    return open_ports
-
-def check_ssl_security(target: str, open_ports: dict) -> dict:
+    return _ports_dict(open_port_infos(port_scan_results))
+
+async def check_ssl_security_async(target: str, open_ports, semaphore=None) -> dict:
     """Check SSL/TLS security for services on open ports."""
     try:
         print("running check ssl secutirty ")
-        scanner = nmap.PortScanner()
+        ip = _lookup(target)
         ssl_results = {}
+        candidates = []
 
-        for port, info in open_ports.items():
-            service = info.get("service", "").lower()
-            if 'ssl' in service or int(port.split('/')[1]) in [443, 8443]:
-                ssl_results[port] = {
+        for p in _as_port_infos(open_ports):
+            service = p.service.lower()
+            if _is_ssl(p.port, service):
+                candidates.append(p)
+                ssl_results[p.key] = {
                     "service": service,
-                    "product": info.get("product", ""),
-                    "version": info.get("version", ""),
+                    "product": p.product,
+                    "version": p.version,
                     "security_issues": [],
                     "remediations": []
                 }
 
-                # Run comprehensive SSL/TLS scripts
-                args = "-sV --script ssl-enum-ciphers,ssl-cert,ssl-known-key,ssl-date,ssl-dh-params,ssl-heartbleed"
-                scanner.scan(target, arguments=f"-p {port.split('/')[1]} {args} -Pn -T4")
-
-                if target in scanner.all_hosts() and 'tcp' in scanner[target]:
-                    port_data = scanner[target]['tcp'].get(int(port.split('/')[1]), {})
-                    scripts = port_data.get('script', {})
-
-                    # SSL/TLS Checks
-                    weak_ciphers = ["RC4", "MD5", "DES", "3DES"]
-                    outdated_tls = ["TLSv1.0", "TLSv1.1", "SSLv2", "SSLv3"]
-                    issues = []
-
-                    # Check ciphers
-                    ssl_ciphers = scripts.get('ssl-enum-ciphers', '')
-                    if ssl_ciphers:
-                        for cipher in weak_ciphers:
-                            if cipher in ssl_ciphers:
-                                issues.append(f"Weak cipher detected: {cipher}")
-                                ssl_results[port]["remediations"].append(
-                                    f"Disable weak cipher {cipher} in server configuration."
-                                )
-                        for tls_version in outdated_tls:
-                            if tls_version in ssl_ciphers:
-                                issues.append(f"Outdated TLS version: {tls_version}")
-                                ssl_results[port]["remediations"].append(
-                                    f"Disable {tls_version} and enable TLSv1.2 or TLSv1.3."
-                                )
-
-                    # Check certificate
-                    ssl_cert = scripts.get('ssl-cert', '')
-                    if ssl_cert:
-                        if "expired" in ssl_cert.lower():
-                            issues.append("SSL certificate is expired")
-                            ssl_results[port]["remediations"].append(
-                                "Renew the SSL certificate"
-                            )
-                        if "self-signed" in ssl_cert.lower():
-                            issues.append("Self-signed SSL certificate detected")
-                            ssl_results[port]["remediations"].append(
-                                "Replace with a certificate from a trusted CA"
-                            )
-
-                    # Check known vulnerabilities
-                    if scripts.get('ssl-known-key', '').lower().find("known vulnerable") >= 0:
-                        issues.append("Known vulnerable SSL key detected")
+        # Run comprehensive SSL/TLS scripts on every candidate port in a single nmap run
+        scripts_by_port = await _ports_scripts(
+            target, ip, [p.port for p in candidates], "ssl", SSL_SCRIPT_ARGS, semaphore
+        )
+
+        for p in candidates:
+            port = p.key
+            scripts = scripts_by_port.get(p.port)
+            if scripts is not None:
+
+                # SSL/TLS Checks
+                issues = []
+
+                # Check ciphers
+                ssl_ciphers = scripts.get('ssl-enum-ciphers', '')
+                if ssl_ciphers:
+                    _detect_ssl(ssl_ciphers, issues, ssl_results[port]["remediations"])
+
+                # Check certificate
+                ssl_cert = scripts.get('ssl-cert', '')
+                if ssl_cert:
+                    if "expired" in ssl_cert.lower():
+                        issues.append("SSL certificate is expired")
                         ssl_results[port]["remediations"].append(
-                            "Regenerate SSL key and update certificates"
+                            "Renew the SSL certificate"
                         )
-
-                    # Check Heartbleed
-                    if scripts.get('ssl-heartbleed', '').lower().find("vulnerable") >= 0:
-                        issues.append("Heartbleed vulnerability detected")
+                    if "self-signed" in ssl_cert.lower():
+                        issues.append("Self-signed SSL certificate detected")
                         ssl_results[port]["remediations"].append(
-                            "Update OpenSSL to a non-vulnerable version"
+                            "Replace with a certificate from a trusted CA"
                         )
 
-                    ssl_results[port]["security_issues"].extend(issues)
+                # Check known vulnerabilities
+                if scripts.get('ssl-known-key', '').lower().find("known vulnerable") >= 0:
+                    issues.append("Known vulnerable SSL key detected")
+                    ssl_results[port]["remediations"].append(
+                        "Regenerate SSL key and update certificates"
+                    )
+
+                # Check Heartbleed
+                if scripts.get('ssl-heartbleed', '').lower().find("vulnerable") >= 0:
+                    issues.append("Heartbleed vulnerability detected")
+                    ssl_results[port]["remediations"].append(
+                        "Update OpenSSL to a non-vulnerable version"
+                    )
+
+                ssl_results[port]["security_issues"].extend(issues)
 
         return ssl_results
 
     except Exception as e:
         return {"error": f"SSL security scan failed: {str(e)}"}
 
-def check_http_security(target: str, open_ports: dict) -> dict:
+def check_ssl_security(target: str, open_ports) -> dict:
+    """Check SSL/TLS security for services on open ports."""
+    return asyncio.run(check_ssl_security_async(target, open_ports))
+
+async def check_http_security_async(target: str, open_ports, semaphore=None) -> dict:
     """Check HTTP security for services on open ports."""
     try:
         print("doing check_http_secutr")
-        scanner = nmap.PortScanner()
+        ip = _lookup(target)
         http_results = {}
+        candidates = []
 
-        for port, info in open_ports.items():
-            service = info.get("service", "").lower()
-            if service in ["http", "https", "ssl"] or int(port.split('/')[1]) in [80, 443, 8080, 8443]:
-                http_results[port] = {
+        for p in _as_port_infos(open_ports):
+            service = p.service.lower()
+            if _is_http(p.port, service):
+                candidates.append(p)
+                http_results[p.key] = {
                     "service": service,
-                    "product": info.get("product", ""),
-                    "version": info.get("version", ""),
+                    "product": p.product,
+                    "version": p.version,
                     "security_issues": [],
                     "remediations": []
                 }
 
-                # Run comprehensive HTTP scripts
-                args = "-sV --script http-headers,http-methods,http-security-headers,http-vuln-cve2017-5638,http-slowloris-check"
-                scanner.scan(target, arguments=f"-p {port.split('/')[1]} {args} -Pn -T4")
-
-                if target in scanner.all_hosts() and 'tcp' in scanner[target]:
-                    port_data = scanner[target]['tcp'].get(int(port.split('/')[1]), {})
-                    scripts = port_data.get('script', {})
-
-                    # HTTP Security Checks
-                    required_headers = [
-                        "Content-Security-Policy",
-                        "Strict-Transport-Security",
-                        "X-Frame-Options",
-                        "X-Content-Type-Options"
-                    ]
-                    issues = []
-
-                    # Check headers
-                    http_headers = scripts.get('http-headers', '') + scripts.get('http-security-headers', '')
-                    for header in required_headers:
-                        if header not in http_headers:
-                            issues.append(f"Missing HTTP header: {header}")
-                            http_results[port]["remediations"].append(
-                                f"Add {header} to HTTP responses"
-                            )
-
-                    # Check unsafe methods
-                    http_methods = scripts.get('http-methods', '')
-                    unsafe_methods = ["TRACE", "DELETE", "PUT"]
-                    for method in unsafe_methods:
-                        if method in http_methods:
-                            issues.append(f"Unsafe HTTP method enabled: {method}")
-                            http_results[port]["remediations"].append(
-                                f"Disable unsafe HTTP method {method}"
-                            )
-
-                    # Check vulnerabilities
-                    if scripts.get('http-vuln-cve2017-5638', '').lower().find("vulnerable") >= 0:
-                        issues.append("CVE-2017-5638 (Struts vulnerability) detected")
+        # Run comprehensive HTTP scripts on every candidate port in a single nmap run
+        scripts_by_port = await _ports_scripts(
+            target, ip, [p.port for p in candidates], "http", HTTP_SCRIPT_ARGS, semaphore
+        )
+
+        for p in candidates:
+            port = p.key
+            scripts = scripts_by_port.get(p.port)
+            if scripts is not None:
+
+                # HTTP Security Checks
+                issues = []
+
+                # Check headers
+                http_headers = scripts.get('http-headers', '') + scripts.get('http-security-headers', '')
+                for header in REQUIRED_HEADERS:
+                    if header not in http_headers:
+                        issues.append(f"Missing HTTP header: {header}")
                         http_results[port]["remediations"].append(
-                            "Update Apache Struts to a patched version"
+                            f"Add {header} to HTTP responses"
                         )
 
-                    if scripts.get('http-slowloris-check', '').lower().find("vulnerable") >= 0:
-                        issues.append("Slowloris vulnerability detected")
+                # Check unsafe methods
+                http_methods = scripts.get('http-methods', '')
+                for method in UNSAFE_METHODS:
+                    if method in http_methods:
+                        issues.append(f"Unsafe HTTP method enabled: {method}")
                         http_results[port]["remediations"].append(
-                            "Configure server to mitigate Slowloris attacks"
+                            f"Disable unsafe HTTP method {method}"
                         )
 
-                    http_results[port]["security_issues"].extend(issues)
+                # Check vulnerabilities
+                if scripts.get('http-vuln-cve2017-5638', '').lower().find("vulnerable") >= 0:
+                    issues.append("CVE-2017-5638 (Struts vulnerability) detected")
+                    http_results[port]["remediations"].append(
+                        "Update Apache Struts to a patched version"
+                    )
+
+                if scripts.get('http-slowloris-check', '').lower().find("vulnerable") >= 0:
+                    issues.append("Slowloris vulnerability detected")
+                    http_results[port]["remediations"].append(
+                        "Configure server to mitigate Slowloris attacks"
+                    )
+
+                http_results[port]["security_issues"].extend(issues)
 
         return http_results
 
     except Exception as e:
         return {"error": f"HTTP security scan failed: {str(e)}"}
 
-if __name__ == "__main__":
-    scanner_target = "127.0.0.1"
+def check_http_security(target: str, open_ports) -> dict:
+    """Check HTTP security for services on open ports."""
+    return asyncio.run(check_http_security_async(target, open_ports))
+
+async def _check_security(target: str, open_ports, limit: int) -> tuple:
+    semaphore = asyncio.Semaphore(limit)
+    return await asyncio.gather(
+        check_ssl_security_async(target, open_ports, semaphore),
+        check_http_security_async(target, open_ports, semaphore),
+    )
+
+def check_security(target: str, open_ports, limit: int = NMAP_CONCURRENCY) -> tuple:
+    """Run the SSL and HTTP checks concurrently on one event loop; returns (ssl_results, http_results)."""
+    return asyncio.run(_check_security(target, open_ports, limit))
+
+def _replay_into_sink(final_result: dict, target: str, ports: str = "1-65535", sink: Optional[NDJSONSink] = None):
+    """Emit a cached pipelined_scan result as the events a live run would have written."""
+    if sink is None:
+        return
+    sink.emit({"phase": "start", "target": target})
+    for port, info in final_result["port_scan"].get('tcp', {}).items():
+        sink.emit({"phase": "port", "port": port, "info": info})
+    for port, info in final_result["open_ports"].items():
+        sink.emit({"phase": "open", "port": port, "info": info})
+    for phase, key in (("ssl", "ssl_security_findings"), ("http", "http_security_findings")):
+        for port, finding in final_result[key].items():
+            sink.emit({"phase": phase, "port": port, "result": finding})
+
+@disk_cached(on_hit=_replay_into_sink)
+def pipelined_scan(target: str, ports: str = "1-65535", sink: Optional[NDJSONSink] = None) -> dict:
+    """Full scan: open-port discovery, service detection, then the SSL and HTTP checks side by side."""
+    emit = sink.emit if sink is not None else (lambda obj: None)
+    emit({"phase": "start", "target": target})
+    tcp = {}
     final_result = {
-        "target": scanner_target,
-        "port_scan": {},
+        "target": target,
+        "port_scan": {'tcp': tcp},
         "open_ports": {},
         "ssl_security_findings": {},
         "http_security_findings": {},
         "errors": []
     }
-
-    print(f"Starting full scan on {scanner_target}...\n")
-
-    # Step 1: Scan for open ports
-    print("[*] Scanning ports...")
-    port_scan_results = scan_target(scanner_target, chunk_size=1000)
-    final_result["port_scan"] = port_scan_results
-
-    if "error" in port_scan_results:
-        print("[!] Port scan failed:", port_scan_results["error"])
-        final_result["errors"].append(f"Port Scan Error: {port_scan_results['error']}")
-    else:
-        print(scanner_target)
-        open_ports = get_open_ports(scanner_target, port_scan_results)
-        final_result["open_ports"] = open_ports
-        print(f"[+] Open ports identified: {open_ports}\n")
-
-        # Step 2: Check SSL/TLS security
-        print("[*] Checking SSL/TLS security...")
-        ssl_results = check_ssl_security(scanner_target, open_ports)
-        final_result["ssl_security_findings"] = ssl_results
-
-        if "error" in ssl_results:
-            print("[!] SSL security check failed:", ssl_results["error"])
-            final_result["errors"].append(f"SSL Scan Error: {ssl_results['error']}")
+    ip = _resolve(target)
+    if ip is None:
+        final_result["port_scan"] = {"error": "Invalid target hostname or IP"}
+        final_result["errors"].append("Port Scan Error: Invalid target hostname or IP")
+        emit({"phase": "error", "message": "Port Scan Error: Invalid target hostname or IP"})
+        return final_result
+
+    # nmap only writes a host's <ports> once that host is done, so service results for a
+    # single target arrive together; the checks simply run once detection has finished.
+    try:
+        open_ports = [str(port) for port, state, _ in stream_nmap(ip, ports, DISCOVERY_ARGS) if state == 'open']
+        if open_ports:
+            for port, _, info in stream_nmap(ip, ",".join(open_ports), SERVICE_ARGS):
+                tcp[port] = info
+                emit({"phase": "port", "port": port, "info": info})
+    except Exception as e:
+        # Ports already reported stay in the result
+        final_result["port_scan"]["error"] = str(e)
+        final_result["errors"].append(f"Port Scan Error: {str(e)}")
+        emit({"phase": "error", "message": f"Port Scan Error: {str(e)}"})
+
+    port_infos = open_port_infos({'tcp': tcp})
+    if not port_infos:
+        return final_result
+
+    print(f"[+] Open ports identified: {[p.key for p in port_infos]}")
+    for key, info in _ports_dict(port_infos).items():
+        final_result["open_ports"][key] = info
+        emit({"phase": "open", "port": key, "info": info})
+
+    ssl_results, http_results = check_security(target, port_infos)
+    for label, key, results in (("SSL", "ssl_security_findings", ssl_results), ("HTTP", "http_security_findings", http_results)):
+        if "error" in results:
+            print(f"[!] {label} security check failed:", results["error"])
+            final_result["errors"].append(f"{label} Scan Error: {results['error']}")
+            emit({"phase": "error", "message": f"{label} Scan Error: {results['error']}"})
         else:
-            print(f"[+] SSL/TLS findings: {ssl_results}\n")
+            print(f"[+] {label} security findings: {results}")
+            final_result[key].update(results)
+            for port, finding in results.items():
+                emit({"phase": label.lower(), "port": port, "result": finding})
+
+    return final_result
+
+_PHASE_KEYS = {"open": "open_ports", "ssl": "ssl_security_findings", "http": "http_security_findings"}
+
+def compact_ndjson_to_json(ndjson_path: str, json_path: str) -> dict:
+    """Rebuild the pipelined_scan result layout from the last run recorded in an NDJSON event log."""
+    final_result = None
+    with open(ndjson_path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                event = orjson.loads(line) if orjson is not None else json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            phase = event.get("phase")
+            if phase == "start":
+                final_result = {
+                    "target": event["target"],
+                    "port_scan": {'tcp': {}},
+                    "open_ports": {},
+                    "ssl_security_findings": {},
+                    "http_security_findings": {},
+                    "errors": []
+                }
+            elif final_result is None:
+                continue
+            elif phase == "port":
+                final_result["port_scan"]['tcp'][event["port"]] = event["info"]
+            elif phase == "error":
+                final_result["errors"].append(event["message"])
+            elif phase == "open":
+                final_result["open_ports"][event["port"]] = event["info"]
+            elif phase in _PHASE_KEYS:
+                final_result[_PHASE_KEYS[phase]][event["port"]] = event["result"]
+
+    if final_result is None:
+        final_result = {}
+    save_json(final_result, json_path)
+    return final_result
 
-        # Step 3: Check HTTP security
-        print("[*] Checking HTTP security...")
-        http_results = check_http_security(scanner_target, open_ports)
-        final_result["http_security_findings"] = http_results
+if __name__ == "__main__":
+    scanner_target = "127.0.0.1"
+    if "--no-cache" in sys.argv:
+        disable_scan_cache()
 
-        if "error" in http_results:
-            print("[!] HTTP security check failed:", http_results["error"])
-            final_result["errors"].append(f"HTTP Scan Error: {http_results['error']}")
-        else:
-            print(f"[+] HTTP security findings: {http_results}\n")
+    print(f"Starting full scan on {scanner_target}...\n")
+    # Findings are appended here as they arrive; compact_ndjson_to_json recovers an interrupted run
+    with NDJSONSink("data/scanned_results.ndjson") as sink:
+        final_result = pipelined_scan(scanner_target, sink=sink)
 
-    # Step 4: Save all results
+    # Save all results
     save_json(final_result, "data/scanned_results.json")
     print("[✓] All scan results saved to 'data/scanned_results.json'")
\ No newline at end of file
@@ -1,13 +1,127 @@
+import gzip
+import hashlib
+import os
 import socket
 import json
+import threading
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Optional
 
-def validate_target(target: str) -> bool:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SCAN_CACHE_DIR = Path(os.getenv("SCAN_CACHE_DIR", "data/cache"))
+SCAN_CACHE_TTL = 3600
+
+_scan_cache_enabled = os.getenv("SCAN_CACHE", "1") != "0"
+
+@lru_cache(maxsize=4096)
+def _lookup(target: str) -> str:
+    # Failures raise and so are not cached; a transient DNS error is retried next call
+    return socket.getaddrinfo(target, None, type=socket.SOCK_STREAM)[0][4][0]
+
+def _resolve(target: str) -> Optional[str]:
     try:
-        socket.gethostbyname(target)
-        return True
-    except socket.error:
-        return False
+        return _lookup(target)
+    except (socket.error, UnicodeError):
+        return None
+
+def validate_target(target: str) -> bool:
+    return _resolve(target) is not None
 
 def save_json(data: dict, filename: str):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=4)
+    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    if orjson is None:
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4)
+        return
+    # Serialised in one pass and written in one call; int port keys are accepted as-is
+    with open(filename, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+class NDJSONSink:
+    """Appends one JSON record per line, flushed as written, so an interrupted scan keeps what it found."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.f = open(path, "ab")
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        # Stable across runs so disk_cached keys do not depend on the object address
+        return f"NDJSONSink({self.path!r})"
+
+    def emit(self, obj):
+        line = _dumps(obj) + b"\n"
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def disable_scan_cache():
+    global _scan_cache_enabled
+    _scan_cache_enabled = False
+
+def _failed(result) -> bool:
+    if isinstance(result, (list, tuple)):
+        return any(_failed(part) for part in result)
+    return isinstance(result, dict) and ("error" in result or bool(result.get("errors")))
+
+def _dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data).encode()
+
+def _loads(buf: bytes):
+    return orjson.loads(buf) if orjson is not None else json.loads(buf)
+
+def disk_cached(ttl: int = SCAN_CACHE_TTL, on_hit=None):
+    """Keep a scan function's result on disk for ttl seconds; no_cache=True forces a fresh run.
+
+    on_hit(result, *args, **kwargs) is called when a cached result is returned, for
+    side effects the skipped function body would otherwise have had.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, no_cache: bool = False, **kwargs):
+            if not _scan_cache_enabled:
+                return func(*args, **kwargs)
+
+            key = repr((func.__qualname__, args, sorted(kwargs.items())))
+            path = SCAN_CACHE_DIR / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.json.gz"
+            if not no_cache:
+                try:
+                    if time.time() - path.stat().st_mtime < ttl:
+                        with gzip.open(path, "rb") as f:
+                            result = _loads(f.read())
+                        if on_hit is not None:
+                            on_hit(result, *args, **kwargs)
+                        return result
+                except (OSError, ValueError):
+                    pass
+
+            result = func(*args, **kwargs)
+            # Failed scans are not stored, so the next call tries again
+            if not _failed(result):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                with gzip.open(tmp, "wb") as f:
+                    f.write(_dumps(result))
+                os.replace(tmp, path)
+            return result
+        return wrapper
+    return decorator
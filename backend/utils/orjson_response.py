@@ -0,0 +1,21 @@
+import json
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def orjson_response(data, status: int = 200):
+    """Build a JSON response serialised with orjson, falling back to the stdlib json module"""
+    if orjson is not None:
+        body = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        body = json.dumps(data)
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+def ndjson_line(data) -> bytes:
+    """Serialise one record as a newline-terminated JSON line"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data).encode() + b"\n"
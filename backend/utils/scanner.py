@@ -1,17 +1,31 @@
+import os
+import sys
 from config_loader import (
   get_guided_input,
   load_config,
   get_default_source_path,
 )
 
-def review_source(config):
+def _iter_php(root):
+  # Plain scandir walk: no Path objects or glob matching per entry
+  stack = [root]
+  while stack:
+    with os.scandir(stack.pop()) as it:
+      for entry in it:
+        if entry.is_dir(follow_symlinks=False):
+          stack.append(entry.path)
+        elif entry.name.endswith(".php"):
+          yield entry.path
+
+def review_source(config, verbose=False):
   print(f"[•] Reviewing source at: {config['source_file']}")
   try:
-    from pathlib import Path
-    files = list(Path(config['source_file']).rglob("*.php"))
-    print(f"[✓] Found {len(files)} source files")
-    for file in files:
-      print(f"  - {file}")
+    count = 0
+    for path in _iter_php(config['source_file']):
+      count += 1
+      if verbose:
+        print(f"  - {path}")
+    print(f"[✓] Found {count} source files")
   except Exception as e:
     print(f"[!] Error reading source: {e}")
 
@@ -20,7 +34,7 @@ def main():
   if not config:
     print("[!] No config found. Launching guided mode.")
     config = get_guided_input()
-  review_source(config)
+  review_source(config, verbose="--verbose" in sys.argv)
 
 if __name__ == "__main__":
   main()
@@ -0,0 +1,8 @@
+# Production entrypoint, run from backend/ (settings live in gunicorn.conf.py):
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# Threaded workers rather than gevent: several routes drive asyncio.run()
+# and subprocesses, which do not mix well with gevent's monkey-patching.
+from app import app
+
+if __name__ == "__main__":
+    app.run(port=5000)